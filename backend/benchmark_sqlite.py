@@ -0,0 +1,123 @@
+"""
+Benchmark of the backend's SQLite read path: a fresh default connection per request (old
+get_db_connection behaviour) vs. the shared SQLiteReadPool, on the same queries the endpoints run.
+
+A second table times /api/sql_search's 1-2 character keywords: the LIKE scan they used to take
+vs. the articles_ngram index (only when the database has one).
+
+Usage:
+    python backend/benchmark_sqlite.py --threads 8 --requests 2000
+For end-to-end requests/sec through uvicorn, use backend/load_test.py against both versions.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlite_pool import SQLiteReadPool
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB_PATH = os.path.join(BASE_DIR, 'fudan_knowledge_base.db')
+
+def make_workloads(article_ids):
+    """(name, sql, params factory) for the queries behind get_article / sql_search / time_machine."""
+    return [
+        ("get_article", "SELECT * FROM articles WHERE id = ?",
+         lambda: (random.choice(article_ids),)),
+        ("sql_search", "SELECT id, title, publish_date, source, content FROM articles "
+                       "WHERE source = ? ORDER BY publish_date DESC LIMIT ?",
+         lambda: (random.choice(["news", "wechat", "business"]), 10)),
+        ("time_machine", "SELECT * FROM articles ORDER BY RANDOM() LIMIT 1",
+         lambda: ()),
+    ]
+
+def short_keywords(conn, count=50):
+    """2-character letter/digit keywords cut from random titles, like the short terms users type."""
+    keywords = []
+    for (title,) in conn.execute("SELECT title FROM articles WHERE title IS NOT NULL ORDER BY RANDOM() LIMIT ?", (count * 4,)):
+        pairs = [title[i:i + 2] for i in range(len(title) - 1) if title[i:i + 2].isalnum()]
+        if pairs:
+            keywords.append(random.choice(pairs))
+    return keywords[:count]
+
+def make_short_keyword_workloads(keywords):
+    """The strict-match filter of run_sql_search, as a full LIKE scan and behind the articles_ngram lookup."""
+    strict = "(a.title LIKE ? OR a.content LIKE ?)"
+    def like_params():
+        keyword = random.choice(keywords)
+        return (f"%{keyword}%", f"%{keyword}%{keyword}%", 20)
+    def ngram_params():
+        keyword = random.choice(keywords)
+        return (f'"{keyword}"', f"%{keyword}%", f"%{keyword}%{keyword}%", 20)
+    return [
+        ("like_scan", f"SELECT a.id FROM articles a WHERE {strict} ORDER BY a.publish_date DESC LIMIT ?",
+         like_params),
+        ("ngram_index", "SELECT a.id FROM articles_ngram JOIN articles a ON a.id = articles_ngram.rowid "
+                        f"WHERE articles_ngram MATCH ? AND {strict} "
+                        "ORDER BY bm25(articles_ngram, 10.0, 1.0), a.publish_date DESC LIMIT ?",
+         ngram_params),
+    ]
+
+def fresh_connection_query(db_path, sql, params):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute(sql, params).fetchall()
+    conn.close()
+    return rows
+
+def run(query_fn, workload, threads, total):
+    name, sql, params_fn = workload
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda _: query_fn(sql, params_fn()), range(total)))
+    elapsed = time.perf_counter() - start
+    return total / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite read path benchmark (fresh connection vs. pool)")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found: {args.db}")
+        return
+
+    conn = sqlite3.connect(args.db)
+    article_ids = [row[0] for row in conn.execute("SELECT id FROM articles")]
+    keywords = short_keywords(conn)
+    has_ngram = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'articles_ngram'").fetchone()
+    conn.close()
+    if not article_ids:
+        print("❌ No articles in database.")
+        return
+
+    pool = SQLiteReadPool(args.db, size=args.threads)
+
+    print("=" * 60)
+    print(f"DB: {args.db} | {len(article_ids)} articles | {args.threads} threads | {args.requests} requests")
+    print("=" * 60)
+    print(f"{'workload':<14} {'fresh req/s':>12} {'pool req/s':>12} {'speedup':>8}")
+    for workload in make_workloads(article_ids):
+        before = run(lambda sql, params: fresh_connection_query(args.db, sql, params), workload, args.threads, args.requests)
+        after = run(pool.fetchall, workload, args.threads, args.requests)
+        print(f"{workload[0]:<14} {before:>12.0f} {after:>12.0f} {after / before:>7.2f}x")
+
+    if not keywords:
+        return
+    if not has_ngram:
+        print("⚠️ No articles_ngram table (rebuild with build_knowledge_base.py); short keywords use the LIKE scan")
+        return
+    print("-" * 60)
+    print(f"Short keywords ({len(keywords)} sampled, e.g. {', '.join(keywords[:5])}), pooled")
+    like_scan, ngram_index = make_short_keyword_workloads(keywords)
+    before = run(pool.fetchall, like_scan, args.threads, args.requests)
+    after = run(pool.fetchall, ngram_index, args.threads, args.requests)
+    print(f"{'like_scan':<14} {before:>12.0f} req/s")
+    print(f"{'ngram_index':<14} {after:>12.0f} req/s {after / before:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import re
+from datetime import date
+from typing import Optional
+
+# Shared by build_knowledge_base.py (ingest) and backend/main.py (queries) so both map dates identically.
+# Accepts 2024-03-15, 2024/3/15, 2024.03.15, 2024年3月15日 ...; anything else ("Unknown_Date") -> None.
+DATE_PATTERN = re.compile(r'(\d{4})\D{1,2}(\d{1,2})\D{1,2}(\d{1,2})')
+
+def parse_date_day(text: Optional[str]) -> Optional[int]:
+    """Free-text publish date -> integer day number (proleptic Gregorian ordinal), or None if unparseable."""
+    if not text:
+        return None
+    match = DATE_PATTERN.search(text)
+    if not match:
+        return None
+    try:
+        return date(int(match.group(1)), int(match.group(2)), int(match.group(3))).toordinal()
+    except ValueError:
+        return None
+
+def normalize_date(text: Optional[str]) -> Optional[str]:
+    """Any accepted spelling of a day ("2024-1-5", "2024年1月5日" ...) -> ISO "2024-01-05", or None if unparseable."""
+    day = parse_date_day(text)
+    return date.fromordinal(day).isoformat() if day is not None else None
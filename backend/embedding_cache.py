@@ -0,0 +1,136 @@
+import os
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# On-disk layout of an embedding cache directory:
+#   keys.db          -> SQLite `embeddings` table: (text hash, model, task_type, dimension) -> row
+#   vectors_<d>.f32  -> append-only float32 matrix of all cached d-dimensional vectors, memory-mapped on read
+KEYS_DB_NAME = "keys.db"
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    Persistent embedding store shared by every index build. Vectors are appended to the matrix file
+    before their keys are committed, so a crash can leave unused rows behind but never a key
+    pointing at a vector that was not written.
+    """
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._maps = {}  # dimension -> np.memmap, reopened when the file has grown past it
+        self.conn = sqlite3.connect(os.path.join(cache_dir, KEYS_DB_NAME), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                text_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                task_type TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                row INTEGER NOT NULL,
+                PRIMARY KEY (text_hash, model, task_type, dimension)
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+
+    def _vectors_path(self, dimension: int) -> str:
+        return os.path.join(self.cache_dir, f"vectors_{dimension}.f32")
+
+    def _rows(self, dimension: int) -> int:
+        path = self._vectors_path(dimension)
+        return os.path.getsize(path) // (dimension * 4) if os.path.exists(path) else 0
+
+    def _matrix(self, dimension: int, min_rows: int):
+        matrix = self._maps.get(dimension)
+        if matrix is None or len(matrix) < min_rows:
+            rows = self._rows(dimension)
+            matrix = np.memmap(self._vectors_path(dimension), dtype=np.float32, mode="r", shape=(rows, dimension))
+            self._maps[dimension] = matrix
+        return matrix
+
+    def default_dimension(self, model: str, task_type: str):
+        """Dimension already cached for this model/task (used when the caller didn't request one)."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT dimension FROM embeddings WHERE model = ? AND task_type = ? LIMIT 1", (model, task_type)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, texts, model: str, task_type: str, dimension: int):
+        """Cached vectors in `texts` order, None for misses."""
+        hashes = [text_hash(t) for t in texts]
+        with self._lock:
+            rows = {}
+            unique = list(set(hashes))
+            for i in range(0, len(unique), 500):  # Stay under SQLite's bound-parameter limit
+                part = unique[i : i + 500]
+                rows.update(self.conn.execute(
+                    f"SELECT text_hash, row FROM embeddings WHERE model = ? AND task_type = ? AND dimension = ? "
+                    f"AND text_hash IN ({','.join('?' * len(part))})",
+                    (model, task_type, dimension, *part)
+                ).fetchall())
+            if not rows:
+                return [None] * len(texts)
+            matrix = self._matrix(dimension, max(rows.values()) + 1)
+            return [np.array(matrix[rows[h]]).tolist() if h in rows else None for h in hashes]
+
+    def put_many(self, texts, vectors, model: str, task_type: str):
+        if not texts:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        dimension = matrix.shape[1]
+        with self._lock:
+            path = self._vectors_path(dimension)
+            start = self._rows(dimension)
+            with open(path, "ab") as f:
+                f.truncate(start * dimension * 4)  # Drop a torn trailing row from an interrupted append
+                f.write(matrix.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (text_hash, model, task_type, dimension, row) VALUES (?, ?, ?, ?, ?)",
+                ((text_hash(t), model, task_type, dimension, start + i) for i, t in enumerate(texts))
+            )
+            self.conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+class CachedEmbeddings(Embeddings):
+    """
+    Drop-in LangChain Embeddings wrapper: documents are looked up in the cache first and only the
+    misses are sent to the wrapped model. Queries are passed straight through.
+    """
+    def __init__(self, embeddings, cache: EmbeddingCache, model: str, task_type: str, dimension: int = None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = model
+        self.task_type = task_type
+        self.dimension = dimension or cache.default_dimension(model, task_type)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # Counters are updated from concurrent embedding workers
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        vectors = self.cache.get_many(texts, self.model, self.task_type, self.dimension) if self.dimension else [None] * len(texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        if missing:
+            fresh = self.embeddings.embed_documents([texts[i] for i in missing])
+            self.cache.put_many([texts[i] for i in missing], fresh, self.model, self.task_type)
+            self.dimension = self.dimension or len(fresh[0])
+            for i, vector in zip(missing, fresh):
+                vectors[i] = list(vector)
+        return vectors
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
@@ -0,0 +1,156 @@
+import time
+import queue
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.embeddings import Embeddings
+
+# HTTP statuses worth retrying: quota (429) and transient server errors
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+# Markers for errors that arrive as wrapped exceptions / gRPC codes without a numeric status
+RETRYABLE_MARKERS = {
+    429: ("429", "RESOURCE_EXHAUSTED", "quota", "rate limit"),
+    503: ("503", "UNAVAILABLE", "DEADLINE_EXCEEDED", "500", "502", "504", "INTERNAL"),
+}
+
+def error_status(e: Exception):
+    """Best-effort HTTP status of an API error (google.api_core, httpx or a wrapped LangChain error)."""
+    for attr in ("code", "status_code"):
+        value = getattr(e, attr, None)
+        try:
+            if value is not None and not callable(value):
+                return int(value)
+        except (TypeError, ValueError):
+            pass
+    text = str(e)
+    for status, markers in RETRYABLE_MARKERS.items():
+        if any(marker.lower() in text.lower() for marker in markers):
+            return status
+    return None
+
+class TokenBucket:
+    """
+    Thread-safe request limiter: `requests_per_minute` on average with bursts up to `capacity`.
+    On 429 the rate is halved, then it creeps back up with every success (AIMD),
+    so the builder settles just under whatever quota the project actually has.
+    """
+    def __init__(self, requests_per_minute: float, capacity: int = 1):
+        self.max_rate = requests_per_minute / 60.0
+        self.rate = self.max_rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def throttle(self):
+        with self._lock:
+            self._refill()
+            self.rate = max(self.max_rate / 20, self.rate / 2)
+            self.tokens = 0
+
+    def recover(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    @property
+    def requests_per_minute(self):
+        return self.rate * 60
+
+class RateLimitedEmbeddings(Embeddings):
+    """
+    Wraps the API embeddings: every call takes a token from the shared bucket, and 429/5xx errors
+    are retried with jittered exponential backoff. Other errors get a few quick retries.
+    """
+    def __init__(self, embeddings, limiter: TokenBucket, max_retries: int = 8, max_other_retries: int = 3):
+        self.embeddings = embeddings
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.max_other_retries = max_other_retries
+        self.retries = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+                self.limiter.recover()
+                return vectors
+            except Exception as e:
+                status = error_status(e)
+                retryable = status in RETRYABLE_STATUSES
+                if status == 429:
+                    self.limiter.throttle()
+                    with self._lock:
+                        self.throttled += 1
+                attempt += 1
+                if attempt > (self.max_retries if retryable else self.max_other_retries):
+                    raise
+                with self._lock:
+                    self.retries += 1
+                time.sleep(min(60, 2 ** attempt) * random.uniform(0.5, 1.0))
+
+    def embed_query(self, text):
+        self.limiter.acquire()
+        return self.embeddings.embed_query(text)
+
+def ordered_map(fn, items, concurrency: int):
+    """
+    Runs fn over items on `concurrency` threads and yields (item, result) in input order.
+    At most 2 * concurrency items are in flight, so a slow batch holds back insertion
+    (keeping ids/positions deterministic) without letting finished work pile up unbounded.
+    """
+    window = deque()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for item in items:
+            window.append((item, executor.submit(fn, item)))
+            if len(window) >= 2 * concurrency:
+                head, future = window.popleft()
+                yield head, future.result()
+        while window:
+            head, future = window.popleft()
+            yield head, future.result()
+
+_DONE = object()
+
+def prefetch(items, maxsize: int):
+    """
+    Runs the `items` generator on its own thread, at most `maxsize` items ahead of the consumer
+    (a bounded queue between two pipeline stages). Errors in the producer are re-raised here.
+    """
+    buffer = queue.Queue(maxsize)
+
+    def produce():
+        try:
+            for item in items:
+                buffer.put((item, None))
+            buffer.put((_DONE, None))
+        except BaseException as e:
+            buffer.put((_DONE, e))
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        item, error = buffer.get()
+        if item is _DONE:
+            if error is not None:
+                raise error
+            return
+        yield item
@@ -0,0 +1,164 @@
+import os
+import json
+import shutil
+import sqlite3
+import numpy as np
+import faiss
+
+try:
+    from backend.vector_store import write_chunk_store, INDEX_FILE_NAME, CHUNKS_DB_NAME
+except ImportError:  # Running from inside backend/
+    from vector_store import write_chunk_store, INDEX_FILE_NAME, CHUNKS_DB_NAME
+
+# Build-side checkpoint layout inside an index directory:
+#   _checkpoint/manifest.json         -> committed parts (+ "merging" flag during the final swap)
+#   _checkpoint/part_000001.npy/.jsonl -> vectors / chunk ids added since the last merge
+#   _checkpoint/rows.db               -> text + metadata of every chunk this run has seen (on disk, not in RAM)
+#   _checkpoint/merge/                -> full index written by merge(), renamed into place
+CHECKPOINT_DIR_NAME = "_checkpoint"
+SERVING_FILES = (INDEX_FILE_NAME, CHUNKS_DB_NAME)
+LEGACY_FILES = ("index.pkl",)  # Pickled docstore of older builds, superseded by chunks.db
+
+def _atomic_write(path, write):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class IndexCheckpoint:
+    """
+    Append-only checkpoints for an index build: each commit writes only the batches added since the
+    previous one as a new part file, and the manifest that lists committed parts is replaced atomically.
+    Checkpoint I/O is therefore linear in the build size, and the serving files are only touched by
+    merge(), which swaps them in by rename.
+    Chunk text never stays in memory: write_rows() streams it to rows.db batch by batch, and
+    merge() copies it from there into chunks.db in FAISS position order.
+    """
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        self.dir = os.path.join(index_dir, CHECKPOINT_DIR_NAME)
+        self.manifest_path = os.path.join(self.dir, "manifest.json")
+        self.pending = []  # (ids, vectors) batches not yet committed
+        self.manifest = self._read_manifest()
+        self.rows_path = os.path.join(self.dir, "rows.db")
+        self.rows = None
+
+    def _read_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"parts": [], "merging": False}
+
+    def _write_manifest(self):
+        os.makedirs(self.dir, exist_ok=True)
+        _atomic_write(self.manifest_path, lambda f: f.write(json.dumps(self.manifest, indent=2).encode("utf-8")))
+
+    def recover(self):
+        """Finishes a merge that was interrupted after the new serving files were fully written."""
+        if not self.manifest.get("merging"):
+            return
+        print("🔁 Completing interrupted index merge...")
+        self._swap_in()
+
+    def parts(self):
+        """Committed parts in order: (ids, vectors)."""
+        for part in self.manifest["parts"]:
+            base = os.path.join(self.dir, part["name"])
+            vectors = np.load(base + ".npy")
+            with open(base + ".jsonl", "r", encoding="utf-8") as f:
+                ids = [json.loads(line)["id"] for line in f]
+            yield ids, vectors
+
+    def add(self, ids, vectors):
+        self.pending.append((ids, vectors))
+
+    def reset_rows(self):
+        """
+        Starts this run's rows.db. Every chunk the run reads is written to it (new or not), so the
+        copy a crashed run left behind is never needed and is simply dropped.
+        """
+        os.makedirs(self.dir, exist_ok=True)
+        if os.path.exists(self.rows_path):
+            os.remove(self.rows_path)
+        self.rows = sqlite3.connect(self.rows_path)
+        self.rows.execute("PRAGMA journal_mode=OFF")
+        self.rows.execute("PRAGMA synchronous=OFF")
+        self.rows.execute("""
+            CREATE TABLE rows (
+                chunk_id TEXT PRIMARY KEY,
+                page_content TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            )
+        """)
+
+    def write_rows(self, ids, texts, metadatas):
+        self.rows.executemany(
+            "INSERT OR REPLACE INTO rows (chunk_id, page_content, metadata) VALUES (?, ?, ?)",
+            ((chunk_id, text, json.dumps(metadata, ensure_ascii=False))
+             for chunk_id, text, metadata in zip(ids, texts, metadatas))
+        )
+        self.rows.commit()
+
+    def commit(self):
+        if not self.pending:
+            return
+        ids, vectors = [], []
+        for batch in self.pending:
+            ids += batch[0]
+            vectors += list(batch[1])
+        name = f"part_{len(self.manifest['parts']) + 1:06d}"
+        base = os.path.join(self.dir, name)
+        os.makedirs(self.dir, exist_ok=True)
+
+        # Part files first, manifest last: a part only exists for readers once the manifest names it
+        _atomic_write(base + ".npy", lambda f: np.save(f, np.asarray(vectors, dtype=np.float32)))
+        _atomic_write(base + ".jsonl", lambda f: f.write("".join(
+            json.dumps({"id": i}, ensure_ascii=False) + "\n" for i in ids
+        ).encode("utf-8")))
+        self.manifest["parts"].append({"name": name, "vectors": len(ids)})
+        self._write_manifest()
+        self.pending = []
+
+    def merge(self, index, ids):
+        """
+        Writes the full index and its chunks.db once (row i = FAISS position i = ids[i], text from rows.db)
+        and renames them over the serving files, then drops the checkpoint.
+        """
+        merge_dir = os.path.join(self.dir, "merge")
+        if os.path.exists(merge_dir):
+            shutil.rmtree(merge_dir)
+        os.makedirs(merge_dir)
+        faiss.write_index(index, os.path.join(merge_dir, INDEX_FILE_NAME))
+
+        self.rows.execute("CREATE TEMP TABLE positions (vector_id INTEGER PRIMARY KEY, chunk_id TEXT NOT NULL)")
+        self.rows.executemany("INSERT INTO positions (vector_id, chunk_id) VALUES (?, ?)", enumerate(ids))
+        written = write_chunk_store(merge_dir, (
+            (vector_id, chunk_id, text, json.loads(metadata))
+            for vector_id, chunk_id, text, metadata in self.rows.execute(
+                "SELECT p.vector_id, p.chunk_id, r.page_content, r.metadata "
+                "FROM positions p JOIN rows r USING (chunk_id) ORDER BY p.vector_id")
+        ))
+        if written != len(ids):
+            raise RuntimeError(f"chunks.db would have {written} rows for {len(ids)} vectors")
+
+        self.manifest["merging"] = True
+        self._write_manifest()
+        self._swap_in()
+
+    def _swap_in(self):
+        if self.rows is not None:
+            self.rows.close()
+            self.rows = None
+        merge_dir = os.path.join(self.dir, "merge")
+        for file_name in SERVING_FILES:
+            merged = os.path.join(merge_dir, file_name)
+            if os.path.exists(merged):
+                os.replace(merged, os.path.join(self.index_dir, file_name))
+        for file_name in LEGACY_FILES:
+            if os.path.exists(os.path.join(self.index_dir, file_name)):
+                os.remove(os.path.join(self.index_dir, file_name))
+        shutil.rmtree(self.dir)
+        self.manifest = {"parts": [], "merging": False}
+        self.pending = []
@@ -0,0 +1,84 @@
+"""
+Load test for the backend: fires the same request at increasing concurrency levels
+and reports throughput, so we can verify that slow LLM / FAISS calls overlap instead
+of serialising on the event loop.
+
+Usage:
+    python backend/load_test.py --endpoint rag_search --requests 40 --concurrency 1 2 4 8 16
+    python backend/load_test.py --base-url https://your-backend.onrender.com --endpoint time_machine
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DEFAULT_BASE_URL = "http://localhost:8000"
+
+# Endpoint name -> (method, path, json body)
+ENDPOINTS = {
+    "rag_search": ("POST", "/api/rag_search", {"query": "人工智能", "top_k": 10}),
+    "sql_search": ("POST", "/api/sql_search", {"keyword": "ESG", "limit": 10}),
+    "article": ("GET", "/api/article/1", None),
+    "summarize_article": ("GET", "/api/summarize_article/1", None),
+    "time_machine": ("GET", "/api/time_machine", None),
+}
+
+def send_request(session, method, url, body):
+    start = time.perf_counter()
+    try:
+        resp = session.request(method, url, json=body, timeout=300)
+        ok = resp.status_code == 200
+    except Exception:
+        ok = False
+    return ok, time.perf_counter() - start
+
+def run_level(base_url, endpoint, total_requests, concurrency):
+    method, path, body = ENDPOINTS[endpoint]
+    url = base_url.rstrip("/") + path
+
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(send_request, session, method, url, body) for _ in range(total_requests)]
+            results = [f.result() for f in futures]
+        wall = time.perf_counter() - wall_start
+
+    latencies = sorted(latency for _, latency in results)
+    errors = sum(1 for ok, _ in results if not ok)
+    return {
+        "concurrency": concurrency,
+        "throughput": total_requests / wall if wall > 0 else 0.0,
+        "p50": statistics.median(latencies),
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "errors": errors,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend throughput vs. concurrency load test")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="rag_search")
+    parser.add_argument("--requests", type=int, default=40, help="Requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"Target: {args.base_url} | Endpoint: {args.endpoint} | {args.requests} requests per level")
+    print("=" * 60)
+    print(f"{'conc':>5} {'req/s':>8} {'p50(s)':>8} {'p95(s)':>8} {'errors':>7} {'speedup':>8}")
+
+    baseline = None
+    for level in args.concurrency:
+        stats = run_level(args.base_url, args.endpoint, args.requests, level)
+        if baseline is None:
+            baseline = stats["throughput"] or 1e-9
+        print(f"{stats['concurrency']:>5} {stats['throughput']:>8.2f} {stats['p50']:>8.2f} "
+              f"{stats['p95']:>8.2f} {stats['errors']:>7} {stats['throughput'] / baseline:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
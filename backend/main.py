@@ -1,11 +1,23 @@
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 import sqlite3
 import os
 import base64
 import io
+import random
+import json
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict, defaultdict
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import faiss
 from dotenv import load_dotenv
 
 # Load environment variables from .env file (if it exists)
@@ -22,6 +34,17 @@ from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
+try:
+    from backend.summary_store import SummaryStore, SUMMARY_PROMPT, SUMMARY_MODEL, summary_input, content_hash
+    from backend.sqlite_pool import SQLiteReadPool
+    from backend.date_utils import parse_date_day, normalize_date
+    from backend.vector_store import MmapFaissStore, has_chunk_store, search_params, published_build
+except ImportError:  # Running as `python backend/main.py`
+    from summary_store import SummaryStore, SUMMARY_PROMPT, SUMMARY_MODEL, summary_input, content_hash
+    from sqlite_pool import SQLiteReadPool
+    from date_utils import parse_date_day, normalize_date
+    from vector_store import MmapFaissStore, has_chunk_store, search_params, published_build
+
 # 1. Configuration & Initialization
 # API Key from Environment Variable (Security Best Practice)
 GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
@@ -45,6 +68,8 @@ else:
 # Define File Paths
 SQLITE_DB_PATH = os.path.join(DATA_DIR, 'fudan_knowledge_base.db')
 FAISS_DB_DIR = os.path.join(DATA_DIR, 'faiss_index') 
+QUERY_CACHE_DB_PATH = os.path.join(DATA_DIR, 'query_cache.db')
+SUMMARY_DB_PATH = os.path.join(DATA_DIR, 'article_summaries.db')
 
 # --- DATA MIGRATION LOGIC (For First Deploy) ---
 # If running on Cloud and data is missing in persistent disk, copy from repo source
@@ -68,6 +93,13 @@ if DATA_DIR != BASE_DIR:
             print("✅ FAISS Index copied successfully.")
         else:
             print("⚠️ Source FAISS index not found in repo!")
+
+    # 3. Check precomputed summaries (optional, produced by precompute_summaries.py)
+    if not os.path.exists(SUMMARY_DB_PATH):
+        src_summaries = os.path.join(BASE_DIR, 'article_summaries.db')
+        if os.path.exists(src_summaries):
+            print("📦 Copying precomputed summaries to Persistent Disk...")
+            shutil.copy2(src_summaries, SUMMARY_DB_PATH)
 # -----------------------------------------------
 
 app = FastAPI(title="Fudan Knowledge Base API")
@@ -83,40 +115,256 @@ app.add_middleware(
 
 # Initialize Models
 # Embedding Model for Vector Search (Task Type: retrieval_query)
+EMBEDDING_MODEL = "models/gemini-embedding-exp-03-07"
+EMBEDDING_TASK_TYPE = "retrieval_query"
 embeddings = GoogleGenerativeAIEmbeddings(
-    model="models/gemini-embedding-exp-03-07",
-    task_type="retrieval_query" 
+    model=EMBEDDING_MODEL,
+    task_type=EMBEDDING_TASK_TYPE
 )
 
 # Chat Model for Query Expansion
+CHAT_MODEL = "gemini-2.5-pro"
 llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-pro", 
+    model=CHAT_MODEL, 
+    temperature=0.3,
+    convert_system_message_to_human=True
+)
+
+# Summaries use SUMMARY_MODEL (shared with precompute_summaries.py), since it is part of SUMMARY_PROMPT_VERSION:
+# switching it invalidates stored summaries, switching CHAT_MODEL does not touch them
+summary_llm = llm if SUMMARY_MODEL == CHAT_MODEL else ChatGoogleGenerativeAI(
+    model=SUMMARY_MODEL,
     temperature=0.3,
     convert_system_message_to_human=True
 )
 
+# Bounded executor for blocking work (FAISS scans, sync SDK calls) so async endpoints never stall the event loop
+BLOCKING_WORKERS = int(os.environ.get("BLOCKING_WORKERS", "8"))
+blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking")
+
+async def run_blocking(func, *args):
+    """Runs a blocking callable on the bounded executor and awaits its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, func, *args)
+
+# Two-tier cache for query understanding & query embeddings
+# Tier 1: in-process LRU with TTL. Tier 2: SQLite table (query_cache.db next to the knowledge base) that survives restarts.
+QUERY_CACHE_MAX_ITEMS = int(os.environ.get("QUERY_CACHE_MAX_ITEMS", "2048"))
+QUERY_CACHE_TTL_SECONDS = int(os.environ.get("QUERY_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+def normalize_query(text: str) -> str:
+    """Canonical cache form of a query: NFKC, lower-case, collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+def prompt_version(*parts: str) -> str:
+    """Short hash of the prompt text + model name; editing a prompt changes the version and invalidates old entries."""
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:12]
+
+class QueryCache:
+    """
+    Two-tier (memory LRU + SQLite) cache of JSON-serialisable values keyed on the normalized query.
+    Each namespace carries a version; entries written under another version are never returned.
+    """
+    def __init__(self, namespace: str, version: str, db_path: str = QUERY_CACHE_DB_PATH,
+                 max_items: int = QUERY_CACHE_MAX_ITEMS, ttl_seconds: int = QUERY_CACHE_TTL_SECONDS):
+        self.namespace = namespace
+        self.version = version
+        self.db_path = db_path
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()  # cache_key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def _init_db(self):
+        try:
+            with self._connect() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS query_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        namespace TEXT NOT NULL,
+                        prompt_version TEXT NOT NULL,
+                        query TEXT NOT NULL,
+                        value TEXT NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                """)
+        except Exception as e:
+            print(f"⚠️ Query cache DB unavailable ({e}), using memory tier only.")
+            self.db_path = None
+
+    def _key(self, query: str) -> str:
+        raw = f"{self.namespace}\x1f{self.version}\x1f{normalize_query(query)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at + self.ttl_seconds)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def get(self, query: str):
+        key = self._key(query)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry[0]
+                del self._memory[key]
+
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT value, created_at FROM query_cache WHERE cache_key = ? AND prompt_version = ?",
+                        (key, self.version)
+                    ).fetchone()
+                if row and row[1] + self.ttl_seconds > now:
+                    value = json.loads(row[0])
+                    with self._lock:
+                        self._remember(key, value, row[1])
+                        self.stats["disk_hits"] += 1
+                    return value
+            except Exception as e:
+                print(f"⚠️ Query cache read failed: {e}")
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def set(self, query: str, value):
+        key = self._key(query)
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO query_cache (cache_key, namespace, prompt_version, query, value, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, self.namespace, self.version, normalize_query(query), json.dumps(value, ensure_ascii=False), now)
+                    )
+            except Exception as e:
+                print(f"⚠️ Query cache write failed: {e}")
+
+    def info(self) -> dict:
+        with self._lock:
+            lookups = sum(self.stats.values())
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            return {
+                "namespace": self.namespace,
+                "prompt_version": self.version,
+                "memory_items": len(self._memory),
+                **self.stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+# Precomputed, versioned article summaries (article_id + content hash + prompt version)
+summary_store = SummaryStore(SUMMARY_DB_PATH)
+
 # Connect to VectorDB (FAISS)
+# create_vector_db_faiss.py publishes each build as faiss_index/builds/<build id>/ and names it in faiss_index/CURRENT;
+# older trees without CURRENT are served from faiss_index/ directly.
+FAISS_SERVING_DIR, FAISS_BUILD_ID = published_build(FAISS_DB_DIR)
+# Preferred layout: one shard per source (or source+year) under shards/, described by manifest.json.
+# Falls back to the monolithic index when no shard manifest exists.
+FAISS_SHARDS_DIR = os.path.join(FAISS_SERVING_DIR, 'shards')
+FAISS_SHARD_MANIFEST = os.path.join(FAISS_SHARDS_DIR, 'manifest.json')
+
+# Which index variant to serve (built with create_vector_db_faiss.py --ann-types) and its default query-time knobs
+FAISS_INDEX_TYPE = os.environ.get("FAISS_INDEX_TYPE", "flat")
+FAISS_NPROBE = int(os.environ.get("FAISS_NPROBE", "16"))
+FAISS_EF_SEARCH = int(os.environ.get("FAISS_EF_SEARCH", "64"))
+
+def load_faiss_index(index_dir: str):
+    # Preferred: mmapped vectors + SQLite chunk table (no pickle, only top-k hits are ever read)
+    if has_chunk_store(index_dir):
+        return MmapFaissStore(index_dir, pool_size=BLOCKING_WORKERS, index_type=FAISS_INDEX_TYPE, build_id=FAISS_BUILD_ID)
+    # Legacy: full pickle docstore loaded into RAM
+    return FAISS.load_local(
+        index_dir, 
+        embeddings, 
+        allow_dangerous_deserialization=True, # Required for local pickle files
+        distance_strategy=DistanceStrategy.COSINE
+    )
+
 vectorstore = None
+shard_stores = {}  # shard name -> {"source": str, "year": Optional[str], "store": FAISS}
 try:
-    if os.path.exists(FAISS_DB_DIR):
-        print(f"🔌 Loading FAISS Index from: {FAISS_DB_DIR}")
-        vectorstore = FAISS.load_local(
-            FAISS_DB_DIR, 
-            embeddings, 
-            allow_dangerous_deserialization=True, # Required for local pickle files
-            distance_strategy=DistanceStrategy.COSINE
-        )
+    if os.path.exists(FAISS_SHARD_MANIFEST):
+        print(f"🔌 Loading sharded FAISS Index from: {FAISS_SHARDS_DIR}")
+        with open(FAISS_SHARD_MANIFEST, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        for name, meta in manifest["shards"].items():
+            shard_stores[name] = {
+                "source": meta["source"],
+                "year": meta.get("year"),
+                "store": load_faiss_index(os.path.join(FAISS_SHARDS_DIR, name)),
+            }
+        print(f"✅ Successfully loaded {len(shard_stores)} FAISS shards: {sorted(shard_stores)}")
+    elif os.path.exists(FAISS_SERVING_DIR):
+        print(f"🔌 Loading FAISS Index from: {FAISS_SERVING_DIR}")
+        vectorstore = load_faiss_index(FAISS_SERVING_DIR)
         print(f"✅ Successfully loaded FAISS Index")
     else:
         print(f"❌ FAISS Index not found at {FAISS_DB_DIR}")
 except Exception as e:
     print(f"❌ Failed to load FAISS Index: {e}")
+    vectorstore, shard_stores = None, {}  # Never serve part of a build
+
+# Article-level centroid index for two-stage (coarse-to-fine) retrieval, built by create_vector_db_faiss.py
+ARTICLE_INDEX_DIR = os.path.join(FAISS_SERVING_DIR, 'articles')
+ARTICLE_SHORTLIST_FACTOR = 2  # Stage 1 shortlists k * factor articles per query row before chunk reranking
+# Two-stage retrieval scores shortlisted chunks exactly, so an approximate FAISS_INDEX_TYPE (and its
+# nprobe / ef_search knobs) would be bypassed. By default it is only used with the exact index.
+TWO_STAGE_RETRIEVAL = os.environ.get("TWO_STAGE_RETRIEVAL", "1" if FAISS_INDEX_TYPE == "flat" else "0") == "1"
+
+article_index = None
+article_meta = None
+article_source_selectors = {}  # source -> faiss.IDSelectorBatch over that source's article positions
+try:
+    if not TWO_STAGE_RETRIEVAL:
+        print(f"ℹ️ Two-stage retrieval disabled, serving the {FAISS_INDEX_TYPE} chunk index directly")
+    elif os.path.exists(os.path.join(ARTICLE_INDEX_DIR, 'index.faiss')) and (vectorstore is not None or shard_stores):
+        article_index = faiss.read_index(os.path.join(ARTICLE_INDEX_DIR, 'index.faiss'))
+        with open(os.path.join(ARTICLE_INDEX_DIR, 'article_meta.json'), 'r', encoding='utf-8') as f:
+            article_meta = json.load(f)
+        if article_meta.get("build_id") != FAISS_BUILD_ID:
+            # Its chunk references are positions of another build's chunk indexes
+            raise ValueError(f"article index is from build {article_meta.get('build_id')}, serving {FAISS_BUILD_ID}")
+        # Source filters are applied inside the stage 1 search (like searching only that source's shards),
+        # so a small source still gets its full shortlist instead of what survives a global top-k
+        positions_by_source = defaultdict(list)
+        for pos, article_source in enumerate(article_meta["sources"]):
+            positions_by_source[article_source].append(pos)
+        article_source_selectors = {
+            article_source: (faiss.IDSelectorBatch(np.asarray(positions, dtype=np.int64)), len(positions))
+            for article_source, positions in positions_by_source.items()
+        }
+        print(f"✅ Loaded article-level index ({article_index.ntotal} articles), two-stage retrieval enabled")
+except Exception as e:
+    print(f"⚠️ Failed to load article-level index, using chunk-only retrieval: {e}")
+    article_index = None
+
+# Shard searches get their own pool: they are submitted from inside blocking_executor tasks
+shard_executor = ThreadPoolExecutor(max_workers=max(1, min(8, len(shard_stores))), thread_name_prefix="faiss-shard")
 
 # 2. Data Models (Pydantic)
 class SearchRequest(BaseModel):
     query: str
     top_k: int = 10
     source: Optional[str] = None
+    # ANN query-time knobs (only used when FAISS_INDEX_TYPE is an IVF / HNSW variant)
+    nprobe: Optional[int] = None
+    ef_search: Optional[int] = None
 
 class SearchResult(BaseModel):
     id: int
@@ -142,60 +390,227 @@ class ConditionalSearchRequest(BaseModel):
     limit: int = 10
 
 # 3. Helper Functions
-def extract_core_query(user_input: str) -> str:
+CORE_QUERY_PROMPT = (
+    "You are a search query extractor. "
+    "Your task is to extract the MAIN topic, entity, or concept from the user's input. "
+    "Remove conversational filler, stopwords, and generic descriptors like 'article', 'paper', 'news', 'info', 'introduction', 'about'.\n\n"
+    "Constraint: Do NOT add new words. Do NOT expand. Do NOT change the meaning. "
+    "Output ONLY the extracted core subject.\n\n"
+    "Example 1:\nUser: 'Show me articles about supply chain management'\nOutput: supply chain management\n\n"
+    "Example 2:\nUser: 'Any news on artificial intelligence?'\nOutput: artificial intelligence\n\n"
+    "Example 3:\nUser: '我想找一下那个机器人的文章'\nOutput: 机器人\n\n"
+    "User Input: {input}\n\n"
+    "Output:"
+)
+
+EXPAND_QUERY_PROMPT = (
+    "You are a precise search query optimizer. "
+    "Generate 3-4 strictly synonymous or highly specific keywords for the user's query "
+    "to improve vector retrieval accuracy.\n\n"
+    "Constraint: Do NOT generate broad topics, parent categories, or loosely related concepts. "
+    "For example, if the query is 'Robot', do NOT output 'AI' or 'Technology'. Output 'Robotics', 'Automaton', 'Bot'.\n\n"
+    "User Query: {query}\n\n"
+    "Output ONLY a comma-separated list of keywords. "
+)
+
+# Cache instances (version = prompt text + model, so editing a prompt invalidates its old entries)
+core_query_cache = QueryCache("core_query", prompt_version(CORE_QUERY_PROMPT, CHAT_MODEL))
+expand_query_cache = QueryCache("expand_query", prompt_version(EXPAND_QUERY_PROMPT, CHAT_MODEL))
+query_embedding_cache = QueryCache("query_embedding", prompt_version(EMBEDDING_MODEL, EMBEDDING_TASK_TYPE))
+
+async def extract_core_query(user_input: str) -> str:
     """
     Extracts the core search intent/keywords from the user's natural language input.
     """
-    prompt = PromptTemplate.from_template(
-        "You are a search query extractor. "
-        "Your task is to extract the MAIN topic, entity, or concept from the user's input. "
-        "Remove conversational filler, stopwords, and generic descriptors like 'article', 'paper', 'news', 'info', 'introduction', 'about'.\n\n"
-        "Constraint: Do NOT add new words. Do NOT expand. Do NOT change the meaning. "
-        "Output ONLY the extracted core subject.\n\n"
-        "Example 1:\nUser: 'Show me articles about supply chain management'\nOutput: supply chain management\n\n"
-        "Example 2:\nUser: 'Any news on artificial intelligence?'\nOutput: artificial intelligence\n\n"
-        "Example 3:\nUser: '我想找一下那个机器人的文章'\nOutput: 机器人\n\n"
-        "User Input: {input}\n\n"
-        "Output:"
-    )
+    cached = await run_blocking(core_query_cache.get, user_input)
+    if cached is not None:
+        print(f"🎯 Input: '{user_input}' -> Core: '{cached}' (cached)")
+        return cached
+
+    prompt = PromptTemplate.from_template(CORE_QUERY_PROMPT)
     chain = prompt | llm | StrOutputParser()
     try:
-        core_query = chain.invoke({"input": user_input})
+        core_query = await chain.ainvoke({"input": user_input})
         core_query = core_query.strip()
         print(f"🎯 Input: '{user_input}' -> Core: '{core_query}'")
+        await run_blocking(core_query_cache.set, user_input, core_query)
         return core_query
     except Exception as e:
         print(f"⚠️ Core query extraction failed: {e}")
         return user_input
 
-def expand_query(original_query: str) -> List[str]:
+async def expand_query(original_query: str) -> List[str]:
     """
     Generates related search terms and returns them as a list of strings.
     """
-    prompt = PromptTemplate.from_template(
-        "You are a precise search query optimizer. "
-        "Generate 3-4 strictly synonymous or highly specific keywords for the user's query "
-        "to improve vector retrieval accuracy.\n\n"
-        "Constraint: Do NOT generate broad topics, parent categories, or loosely related concepts. "
-        "For example, if the query is 'Robot', do NOT output 'AI' or 'Technology'. Output 'Robotics', 'Automaton', 'Bot'.\n\n"
-        "User Query: {query}\n\n"
-        "Output ONLY a comma-separated list of keywords. "
-    )
+    cached = await run_blocking(expand_query_cache.get, original_query)
+    if cached is not None:
+        print(f"🔍 Original: '{original_query}' -> Keywords: {cached} (cached)")
+        return cached
+
+    prompt = PromptTemplate.from_template(EXPAND_QUERY_PROMPT)
     chain = prompt | llm | StrOutputParser()
     try:
-        response = chain.invoke({"query": original_query})
+        response = await chain.ainvoke({"query": original_query})
         # Split by comma and strip whitespace
         keywords = [k.strip() for k in response.split(',') if k.strip()]
         print(f"🔍 Original: '{original_query}' -> Keywords: {keywords}")
+        await run_blocking(expand_query_cache.set, original_query, keywords)
         return keywords
     except Exception as e:
         print(f"⚠️ Query expansion failed: {e}")
         return []
 
-def get_db_connection():
-    conn = sqlite3.connect(SQLITE_DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+def cached_query_vectors(queries: List[str]) -> list:
+    return [query_embedding_cache.get(q) for q in queries]
+
+def store_query_vectors(queries: List[str], vectors: list):
+    for query, vector in zip(queries, vectors):
+        query_embedding_cache.set(query, vector)
+
+async def embed_queries(queries: List[str]) -> np.ndarray:
+    """
+    Returns one embedding row per query. Cached vectors are reused; all misses are
+    embedded together in ONE batched request and written back to the cache.
+    The embedding request is awaited on the event loop rather than run on blocking_executor,
+    so slow API calls never hold the threads that serve SQLite and cache lookups.
+    """
+    vectors = await run_blocking(cached_query_vectors, queries)
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    if missing:
+        missing_queries = [queries[i] for i in missing]
+        fresh = await embeddings.aembed_documents(missing_queries)
+        for i, vector in zip(missing, fresh):
+            vectors[i] = vector
+        await run_blocking(store_query_vectors, missing_queries, fresh)
+    return np.asarray(vectors, dtype=np.float32)
+
+def search_index(store, vectors: np.ndarray, k_limits: List[int], search_filter: Optional[dict] = None,
+                 ann_params: Optional[dict] = None):
+    """
+    Runs ONE multi-row FAISS search on a single index.
+    Returns a list (one entry per query row) of (Document, distance) tuples, each capped at its own k.
+    """
+    # When filtering by metadata we over-fetch so each row still has enough hits after the filter
+    max_k = max(k_limits)
+    fetch_k = max_k if search_filter is None else max_k * 4
+    fetch_k = min(fetch_k, store.index.ntotal)
+    if fetch_k <= 0:
+        return [[] for _ in k_limits]
+    params = search_params(store.index, **(ann_params or {}))
+    if params is not None:
+        distances, indices = store.index.search(vectors, fetch_k, params=params)
+    else:
+        distances, indices = store.index.search(vectors, fetch_k)
+
+    # Resolve ids to Documents per row, honouring each query's own k limit
+    all_results = []
+    for row, k_limit in enumerate(k_limits):
+        row_results = []
+        for idx, distance in zip(indices[row], distances[row]):
+            if idx == -1:
+                continue
+            doc = store.docstore.search(store.index_to_docstore_id[idx])
+            if search_filter and any(doc.metadata.get(key) != value for key, value in search_filter.items()):
+                continue
+            row_results.append((doc, float(distance)))
+            if len(row_results) >= k_limit:
+                break
+        all_results.append(row_results)
+    return all_results
+
+def select_shards(source: Optional[str]) -> list:
+    """Only the shards that can contain hits for the requested source."""
+    if not source or source == "all":
+        return [meta["store"] for meta in shard_stores.values()]
+    return [meta["store"] for meta in shard_stores.values() if meta["source"] == source]
+
+def multi_query_search(vectors: np.ndarray, k_limits: List[int], source: Optional[str] = None,
+                       ann_params: Optional[dict] = None):
+    """
+    Searches all query vectors (one row per query, see embed_queries) as ONE multi-row FAISS query.
+    With shards: scatter to the relevant shards in parallel, then gather an exact top-k per query row.
+    """
+    # 2a. Monolithic index: the source filter is applied while resolving hits
+    if not shard_stores:
+        if getattr(vectorstore, "_normalize_L2", False):
+            faiss.normalize_L2(vectors)
+        search_filter = {"source": source} if source and source != "all" else None
+        return search_index(vectorstore, vectors, k_limits, search_filter, ann_params)
+
+    # 2b. Sharded: every selected shard already matches the source, so no filter / over-fetch is needed
+    stores = select_shards(source)
+    if not stores:
+        return [[] for _ in k_limits]
+    if getattr(stores[0], "_normalize_L2", False):
+        faiss.normalize_L2(vectors)
+    if len(stores) == 1:
+        return search_index(stores[0], vectors, k_limits, None, ann_params)
+
+    futures = [shard_executor.submit(search_index, store, vectors, k_limits, None, ann_params) for store in stores]
+    shard_results = [future.result() for future in futures]
+
+    # 3. Gather: each shard returned its exact top-k, so the k smallest distances of the union are the global top-k
+    merged = []
+    for row, k_limit in enumerate(k_limits):
+        row_hits = [hit for result in shard_results for hit in result[row]]
+        row_hits.sort(key=lambda hit: hit[1])
+        merged.append(row_hits[:k_limit])
+    return merged
+
+def chunk_store(shard_name: str):
+    """Chunk index referenced by the article index ("" = monolithic index)."""
+    return shard_stores[shard_name]["store"] if shard_name else vectorstore
+
+def two_stage_search(vectors: np.ndarray, k_limits: List[int], source: Optional[str] = None):
+    """
+    Coarse-to-fine retrieval:
+    1. Search the article-level centroid index to shortlist k * ARTICLE_SHORTLIST_FACTOR articles per query row.
+    2. Score every chunk of the shortlisted articles exactly and keep the row's k nearest chunks.
+    Returns chunk hits per row, with the same meaning and (Document, distance) shape as multi_query_search:
+    an article can appear once per matching chunk, so vector_search's hit counts mean the same on both paths.
+    """
+    first_store = chunk_store(article_meta["chunks"][0][0][0]) if article_meta["chunks"] else None
+    if getattr(first_store, "_normalize_L2", False):
+        faiss.normalize_L2(vectors)
+
+    # Stage 1: centroids are L2-normalized, so compare against normalized query vectors
+    coarse_vectors = vectors.copy()
+    faiss.normalize_L2(coarse_vectors)
+    shortlist_limits = [k * ARTICLE_SHORTLIST_FACTOR for k in k_limits]
+    if source and source != "all":
+        if source not in article_source_selectors:
+            return [[] for _ in k_limits]
+        selector, candidates = article_source_selectors[source]
+        fetch_k = min(max(shortlist_limits), candidates)
+        _, positions = article_index.search(coarse_vectors, fetch_k, params=faiss.SearchParameters(sel=selector))
+    else:
+        fetch_k = min(max(shortlist_limits), article_index.ntotal)
+        _, positions = article_index.search(coarse_vectors, fetch_k)
+
+    all_results = []
+    for row, k_limit in enumerate(k_limits):
+        shortlist = [p for p in positions[row] if p != -1][:shortlist_limits[row]]
+
+        # Stage 2: exact distance between the query and every chunk of the shortlisted articles
+        row_hits = []
+        for pos in shortlist:
+            for shard_name, idx in article_meta["chunks"][pos]:
+                store = chunk_store(shard_name)
+                chunk_vector = store.index.reconstruct(int(idx))
+                row_hits.append((float(np.sum((chunk_vector - vectors[row]) ** 2)), store, idx))
+
+        row_hits.sort(key=lambda hit: hit[0])
+        all_results.append([
+            (store.docstore.search(store.index_to_docstore_id[idx]), distance)
+            for distance, store, idx in row_hits[:k_limit]
+        ])
+    return all_results
+
+# Shared read-only connection pool (WAL, mmap, large page cache, query_only, cached prepared statements).
+# Only used from run_blocking() workers, so SQLite work never runs on the event loop.
+SQLITE_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", str(BLOCKING_WORKERS)))
+db_pool = SQLiteReadPool(SQLITE_DB_PATH, size=SQLITE_POOL_SIZE)
 
 # 4. API Endpoints
 
@@ -203,16 +618,27 @@ def get_db_connection():
 def health_check():
     return {"status": "ok", "service": "Fudan Knowledge Base Backend (FAISS)"}
 
-@app.post("/api/rag_search", response_model=List[SearchResult])
-async def rag_search(request: SearchRequest):
-    if vectorstore is None:
-        raise HTTPException(status_code=500, detail="Vector Database not available")
+@app.get("/api/cache_stats")
+def cache_stats():
+    return [cache.info() for cache in (core_query_cache, expand_query_cache, query_embedding_cache)]
 
-    # 1. Extract Core Intent (Remove noise from user input)
-    core_query = extract_core_query(request.query)
+def vector_db_available() -> bool:
+    return vectorstore is not None or bool(shard_stores)
+
+async def vector_search(core_query: str, top_k: int, source: Optional[str] = None, timings: Optional[dict] = None,
+                        ann_params: Optional[dict] = None) -> List[SearchResult]:
+    """
+    Multi-query vector retrieval + score fusion for an already extracted core query.
+    If `timings` is given, per-stage durations (ms) are recorded into it.
+    `ann_params` (nprobe / ef_search) tune approximate chunk indexes; the two-stage path (TWO_STAGE_RETRIEVAL)
+    scores chunks exactly and ignores them.
+    """
+    timings = timings if timings is not None else {}
 
     # 2. Multi-Query Generation (Based on the clean core query)
-    expanded_keywords = expand_query(core_query)
+    stage_start = time.perf_counter()
+    expanded_keywords = await expand_query(core_query)
+    timings["expand_ms"] = round((time.perf_counter() - stage_start) * 1000, 1)
     
     # The search queries list includes the core query (priority) and expanded keywords
     search_queries = [core_query] + expanded_keywords
@@ -235,22 +661,26 @@ async def rag_search(request: SearchRequest):
     candidates = {}
 
     print(f"🚀 Executing Search for {len(search_queries)} queries...")
+    stage_start = time.perf_counter()
 
-    for i, query_text in enumerate(search_queries):
-        # We fetch slightly more than top_k for each sub-query to ensure diversity
-        # The original query (i=0) gets significantly more candidates (3x) to maximize "Exact Match" coverage
-        if i == 0:
-            k_limit = max(20, request.top_k * 4) 
-        else:
-            k_limit = request.top_k
-        
-        # Prepare Filter
-        search_filter = None
-        if request.source and request.source != "all":
-            search_filter = {"source": request.source}
+    # One batched embedding call for the whole query set (single round-trip for cache misses;
+    # task_type comes from the model config: retrieval_query)
+    vectors = await embed_queries(search_queries)
 
-        results = vectorstore.similarity_search_with_score(query_text, k=k_limit, filter=search_filter)
-        
+    # We fetch slightly more than top_k for each sub-query to ensure diversity
+    # The original query (i=0) gets significantly more candidates (4x) to maximize "Exact Match" coverage
+    # Both paths return chunk hits for these limits, so hit_count / FREQUENCY_BOOST below mean the same thing
+    k_limits = [max(20, top_k * 4)] + [top_k] * len(expanded_keywords)
+
+    if article_index is not None:
+        batched_results = await run_blocking(two_stage_search, vectors, k_limits, source)
+    else:
+        # One multi-row FAISS search (per relevant shard) for the whole query set (off the event loop)
+        batched_results = await run_blocking(multi_query_search, vectors, k_limits, source, ann_params)
+
+    timings["vector_search_ms"] = round((time.perf_counter() - stage_start) * 1000, 1)
+
+    for i, results in enumerate(batched_results):
         for doc, distance in results:
             # Convert Cosine Distance to Similarity (0 to 1)
             # Cosine Distance = 1 - Cosine Similarity
@@ -305,7 +735,7 @@ async def rag_search(request: SearchRequest):
     # 4. Format Response
     response_data = []
     # Slice to top_k
-    for item in final_results[:request.top_k]:
+    for item in final_results[:top_k]:
         doc = item["data"]["doc"]
         meta = doc.metadata
         
@@ -318,18 +748,83 @@ async def rag_search(request: SearchRequest):
             score=round(item["score"], 4)
         ))
     
-    print(f"✅ Returning {len(response_data)} results after fusion and thresholding.")
-    
     print(f"✅ Returning {len(response_data)} results after fusion and thresholding.")
     return response_data
 
-@app.post("/api/sql_search", response_model=List[SearchResult])
-async def sql_search(request: ConditionalSearchRequest):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def request_ann_params(request: SearchRequest) -> dict:
+    return {
+        "nprobe": request.nprobe or FAISS_NPROBE,
+        "ef_search": request.ef_search or FAISS_EF_SEARCH,
+    }
+
+@app.post("/api/rag_search", response_model=List[SearchResult])
+async def rag_search(request: SearchRequest):
+    if not vector_db_available():
+        raise HTTPException(status_code=500, detail="Vector Database not available")
+
+    # 1. Extract Core Intent (Remove noise from user input)
+    core_query = await extract_core_query(request.query)
+
+    return await vector_search(core_query, request.top_k, request.source, ann_params=request_ann_params(request))
+
+# FTS5 trigram index (built by build_knowledge_base.py). Trigrams need at least 3 characters,
+# so shorter keywords (e.g. 2-character Chinese terms) go to the articles_ngram unigram/bigram index instead.
+FTS_MIN_KEYWORD_LENGTH = 3
+
+def has_table(name: str) -> bool:
+    try:
+        row = db_pool.fetchone("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+        return row is not None
+    except Exception:
+        return False
+
+FTS_AVAILABLE = has_table("articles_fts")
+print(f"{'✅' if FTS_AVAILABLE else '⚠️'} FTS5 keyword index {'available' if FTS_AVAILABLE else 'not found, using LIKE scan'}")
+# Databases built before articles_ngram still answer 1-2 character keywords with the LIKE scan
+NGRAM_AVAILABLE = has_table("articles_ngram")
+print(f"{'✅' if NGRAM_AVAILABLE else '⚠️'} Short-keyword index {'available' if NGRAM_AVAILABLE else 'not found, using LIKE scan'}")
+
+def article_columns() -> set:
+    try:
+        return {row["name"] for row in db_pool.fetchall("PRAGMA table_info(articles)")}
+    except Exception:
+        return set()
 
-    query = "SELECT id, title, publish_date, source, content FROM articles WHERE 1=1"
-    params = []
+# Older databases may predate these build_knowledge_base.py columns; fall back gracefully
+ARTICLE_COLUMNS = article_columns()
+# Precomputed snippet column (covered by the (source, publish_date) indexes); older DBs cut it in SQL instead
+SNIPPET_SQL = "a.snippet" if "snippet" in ARTICLE_COLUMNS else "substr(a.content, 1, 200)"
+# Indexed integer day column for nearest-date lookups
+HAS_DATE_DAY = "date_day" in ARTICLE_COLUMNS
+
+def fts_phrase(keyword: str) -> str:
+    """Quotes the keyword as a single FTS5 phrase so operators/punctuation are matched literally."""
+    return '"' + keyword.replace('"', '""') + '"'
+
+def keyword_index(keyword: Optional[str]) -> Optional[str]:
+    """The FTS5 table that can answer `keyword`, or None for the LIKE scan."""
+    if not keyword:
+        return None
+    if len(keyword) >= FTS_MIN_KEYWORD_LENGTH:
+        return "articles_fts" if FTS_AVAILABLE else None
+    # articles_ngram holds single letter/digit runs of 1-2 characters; anything else has no token to look up
+    return "articles_ngram" if NGRAM_AVAILABLE and keyword.isalnum() else None
+
+def run_sql_search(request: ConditionalSearchRequest):
+    fts_table = keyword_index(request.keyword)
+    use_fts = fts_table is not None
+
+    if use_fts:
+        # BM25 over the FTS index (title weighted 10x over body); lower bm25() = more relevant
+        query = (
+            f"SELECT a.id, a.title, a.publish_date, a.source, {SNIPPET_SQL} AS snippet, bm25({fts_table}, 10.0, 1.0) AS rank "
+            f"FROM {fts_table} JOIN articles a ON a.id = {fts_table}.rowid "
+            f"WHERE {fts_table} MATCH ?"
+        )
+        params = [fts_phrase(request.keyword)]
+    else:
+        query = f"SELECT a.id, a.title, a.publish_date, a.source, {SNIPPET_SQL} AS snippet, NULL AS rank FROM articles a WHERE 1=1"
+        params = []
 
     if request.keyword:
         # Strict Match Logic:
@@ -337,27 +832,33 @@ async def sql_search(request: ConditionalSearchRequest):
         # OR
         # 2. Keyword appears AT LEAST TWICE in Content (Deep relevance)
         # using "%keyword%keyword%" pattern to simulate count >= 2
-        query += " AND (title LIKE ? OR content LIKE ?)"
+        # (With FTS this only runs on the rows the index already matched)
+        query += " AND (a.title LIKE ? OR a.content LIKE ?)"
         params.extend([f"%{request.keyword}%", f"%{request.keyword}%{request.keyword}%"])
     
     if request.start_date:
-        query += " AND publish_date >= ?"
+        query += " AND a.publish_date >= ?"
         params.append(request.start_date)
         
     if request.end_date:
-        query += " AND publish_date <= ?"
+        query += " AND a.publish_date <= ?"
         params.append(request.end_date)
 
     if request.source and request.source != "all":
-        query += " AND source = ?"
+        query += " AND a.source = ?"
         params.append(request.source)
 
-    query += " ORDER BY publish_date DESC LIMIT ?"
+    if use_fts:
+        query += " ORDER BY rank ASC, a.publish_date DESC LIMIT ?"
+    else:
+        query += " ORDER BY a.publish_date DESC LIMIT ?"
     params.append(request.limit)
 
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    conn.close()
+    return db_pool.fetchall(query, params)
+
+@app.post("/api/sql_search", response_model=List[SearchResult])
+async def sql_search(request: ConditionalSearchRequest):
+    rows = await run_blocking(run_sql_search, request)
 
     results = []
     for row in rows:
@@ -366,19 +867,74 @@ async def sql_search(request: ConditionalSearchRequest):
             title=row["title"],
             publish_date=row["publish_date"],
             source=row["source"],
-            snippet=row["content"][:200] + "...",
-            score=1.0 
+            snippet=(row["snippet"] or "") + "...",
+            # BM25 relevance when the FTS index was used (negated so higher = better), else 1.0 as before
+            score=round(-row["rank"], 4) if row["rank"] is not None else 1.0
         ))
     
     return results
 
+# --- Hybrid Search (Vector + Lexical, Reciprocal Rank Fusion) ---
+RRF_K = 60  # Standard RRF damping constant: score = sum(1 / (RRF_K + rank))
+HYBRID_DEPTH_FACTOR = 2  # Each path contributes top_k * factor candidates to the fusion
+
+class HybridSearchResponse(BaseModel):
+    results: List[SearchResult]
+    timings: Dict[str, float]
+
+async def lexical_search(keyword: str, limit: int, source: Optional[str], timings: dict) -> List[SearchResult]:
+    stage_start = time.perf_counter()
+    results = await sql_search(ConditionalSearchRequest(keyword=keyword, source=source, limit=limit))
+    timings["lexical_search_ms"] = round((time.perf_counter() - stage_start) * 1000, 1)
+    return results
+
+@app.post("/api/hybrid_search", response_model=HybridSearchResponse)
+async def hybrid_search(request: SearchRequest):
+    """
+    Runs the FAISS path and the FTS5/BM25 path concurrently on the extracted core query and fuses
+    both rankings with reciprocal-rank fusion. Exact entities (names, course codes) that vector search
+    misses are recovered by the lexical side. Per-stage timings (ms) are returned for tuning.
+    """
+    timings = {}
+    total_start = time.perf_counter()
+
+    # 1. Core query is shared by both paths
+    stage_start = time.perf_counter()
+    core_query = await extract_core_query(request.query)
+    timings["extract_ms"] = round((time.perf_counter() - stage_start) * 1000, 1)
+
+    # 2. Both retrieval paths in parallel
+    depth = request.top_k * HYBRID_DEPTH_FACTOR
+    lexical_task = lexical_search(core_query, depth, request.source, timings)
+    if vector_db_available():
+        vector_results, lexical_results = await asyncio.gather(
+            vector_search(core_query, depth, request.source, timings, request_ann_params(request)), lexical_task
+        )
+    else:
+        vector_results, lexical_results = [], await lexical_task
+
+    # 3. Reciprocal Rank Fusion (vector result kept on ties: its snippet is the matched chunk)
+    stage_start = time.perf_counter()
+    fused = {}
+    for ranking in (vector_results, lexical_results):
+        for rank, result in enumerate(ranking, start=1):
+            entry = fused.setdefault(result.id, {"result": result, "score": 0.0})
+            entry["score"] += 1.0 / (RRF_K + rank)
+
+    ranked = sorted(fused.values(), key=lambda e: e["score"], reverse=True)[:request.top_k]
+    results = [e["result"].model_copy(update={"score": round(e["score"], 4)}) for e in ranked]
+    timings["fusion_ms"] = round((time.perf_counter() - stage_start) * 1000, 1)
+    timings["total_ms"] = round((time.perf_counter() - total_start) * 1000, 1)
+
+    print(f"🔀 Hybrid: {len(vector_results)} vector + {len(lexical_results)} lexical -> {len(results)} fused | {timings}")
+    return HybridSearchResponse(results=results, timings=timings)
+
+def fetch_article(article_id: int):
+    return db_pool.fetchone("SELECT * FROM articles WHERE id = ?", (article_id,))
+
 @app.get("/api/article/{article_id}", response_model=ArticleDetail)
 async def get_article(article_id: int):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM articles WHERE id = ?", (article_id,))
-    row = cursor.fetchone()
-    conn.close()
+    row = await run_blocking(fetch_article, article_id)
 
     if not row:
         raise HTTPException(status_code=404, detail="Article not found")
@@ -400,39 +956,41 @@ class SummaryResponse(BaseModel):
     link: Optional[str] = None
     summary: str
 
+def sse_event(event: str, data) -> str:
+    """Formats one Server-Sent Event; data is JSON-encoded so newlines in Markdown survive."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 @app.get("/api/summarize_article/{article_id}", response_model=SummaryResponse)
 async def summarize_article(article_id: int):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM articles WHERE id = ?", (article_id,))
-    row = cursor.fetchone()
-    conn.close()
+    row = await run_blocking(fetch_article, article_id)
 
     if not row:
         raise HTTPException(status_code=404, detail="Article not found")
 
-    # Construct Prompt for Pure Abstractive Summarization
-    prompt = PromptTemplate.from_template(
-        "任务：对以下文章进行【高保真浓缩摘要】。\n\n"
-        "文章标题：{title}\n"
-        "文章内容：\n{content}\n\n"
-        "【严格约束】：\n"
-        "1. **禁止废话**：严禁出现“好的同学们”、“这篇文章讲了...”、“导读如下”等任何开场白或结束语。直接开始输出正文。\n"
-        "2. **禁止分析**：不要发表评论、不要进行价值判断、不要分析其意义。只陈述原文的事实和观点。\n"
-        "3. **结构还原**：严格按照原文的逻辑结构和段落顺序进行缩写。保留原文的小标题（如果有）。\n"
-        "4. **段落间距**：每一段文字结束后，必须空一行，以确保阅读排版清晰。\n"
-        "5. **长度与细节**：保留原文约 50%-70% 的篇幅。保留所有关键数据、具体案例、人名和核心论据。不要写成短小的提纲，要写成一篇流畅的短文章。\n"
-        "6. **格式**：使用 Markdown 格式。小标题使用 ##，重点内容使用 **加粗**。\n\n"
-        "输出内容："
-    )
+    # 1. Precomputed / previously generated summary -> single SQLite lookup
+    digest = content_hash(row["title"], row["content"])
+    cached_summary = await run_blocking(summary_store.get, row["id"], digest)
+    if cached_summary is not None:
+        return SummaryResponse(
+            id=row["id"],
+            title=row["title"],
+            source=row["source"],
+            publish_date=row["publish_date"],
+            link=row["link"],
+            summary=cached_summary
+        )
+
+    # 2. Construct Prompt for Pure Abstractive Summarization
+    prompt = PromptTemplate.from_template(SUMMARY_PROMPT)
     
-    chain = prompt | llm | StrOutputParser()
+    chain = prompt | summary_llm | StrOutputParser()
     
     try:
-        # Use only the first 15000 chars to avoid token limits if article is huge
+        # Use only the first 20000 chars to avoid token limits if article is huge
         # But generally we want as much context as possible.
-        content_snippet = row["content"][:20000] 
-        summary = chain.invoke({"title": row["title"], "content": content_snippet})
+        summary = await chain.ainvoke(summary_input(row["title"], row["content"]))
+        # Fill the store on first use (fallback output below is never stored)
+        await run_blocking(summary_store.put, row["id"], digest, summary)
         
         return SummaryResponse(
             id=row["id"],
@@ -454,6 +1012,58 @@ async def summarize_article(article_id: int):
             summary=f"> ⚠️ AI 导读生成失败，以下为原文内容：\n\n{row['content']}"
         )
 
+@app.get("/api/summarize_article/{article_id}/stream")
+async def summarize_article_stream(article_id: int):
+    """
+    Streaming variant of /api/summarize_article over Server-Sent Events.
+    Events: `meta` (article info), `token` (summary text pieces), `done` (cached flag) or `error`.
+    A stored summary is replayed immediately; otherwise tokens are pushed as the LLM produces them.
+    """
+    row = await run_blocking(fetch_article, article_id)
+    if not row:
+        raise HTTPException(status_code=404, detail="Article not found")
+
+    digest = content_hash(row["title"], row["content"])
+    cached_summary = await run_blocking(summary_store.get, row["id"], digest)
+
+    async def event_stream():
+        yield sse_event("meta", {
+            "id": row["id"],
+            "title": row["title"],
+            "source": row["source"],
+            "publish_date": row["publish_date"],
+            "link": row["link"],
+        })
+
+        if cached_summary is not None:
+            yield sse_event("token", cached_summary)
+            yield sse_event("done", {"cached": True})
+            return
+
+        chain = PromptTemplate.from_template(SUMMARY_PROMPT) | summary_llm | StrOutputParser()
+        pieces = []
+        try:
+            async for piece in chain.astream(summary_input(row["title"], row["content"])):
+                pieces.append(piece)
+                yield sse_event("token", piece)
+        except Exception as e:
+            print(f"❌ Streaming summary failed: {e}")
+            # Same fallback as the non-streaming endpoint, sent only if nothing was streamed yet
+            if not pieces:
+                yield sse_event("token", f"> ⚠️ AI 导读生成失败，以下为原文内容：\n\n{row['content']}")
+            yield sse_event("error", {"detail": "summary generation failed"})
+            return
+
+        await run_blocking(summary_store.put, row["id"], digest, "".join(pieces))
+        yield sse_event("done", {"cached": False})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Disable proxy buffering (Render/nginx) so the first token reaches the browser immediately
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 class TimeMachineResponse(BaseModel):
     id: int
     title: str
@@ -465,12 +1075,159 @@ class TimeMachineResponse(BaseModel):
 # Initialize GenAI Client for Image Generation
 genai_client = genai.Client(api_key=GOOGLE_API_KEY)
 
-@app.get("/api/time_machine", response_model=TimeMachineResponse)
-async def time_machine(date: Optional[str] = None):
-    conn = get_db_connection()
+# --- Time Machine Pool ---
+# A background producer keeps TIME_MACHINE_POOL_SIZE ready-made (article, quote, image) entries for random requests.
+# Generated entries are also persisted with a date -> article mapping, so repeated dates are served from SQLite.
+TIME_MACHINE_DB_PATH = os.path.join(DATA_DIR, 'time_machine.db')
+TIME_MACHINE_POOL_SIZE = int(os.environ.get("TIME_MACHINE_POOL_SIZE", "6"))
+# Opt-in (image generation is billed): when the random pool is full, keep precomputing entries for every publish date
+TIME_MACHINE_PRECOMPUTE_DATES = os.environ.get("TIME_MACHINE_PRECOMPUTE_DATES") == "1"
+
+class TimeMachineStore:
+    """
+    Persisted Time Machine entries (one per article) plus the per-date article mapping.
+    Dates are keyed in ISO form (normalize_date), so every spelling of a day shares one mapping.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS time_machine_entries (
+                    article_id INTEGER PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    publish_date TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    quote TEXT NOT NULL,
+                    image_base64 TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS time_machine_dates (
+                    date TEXT PRIMARY KEY,
+                    article_id INTEGER NOT NULL
+                )
+            """)
+            # Mappings written before keys were normalized: re-key to ISO, drop unparseable ones
+            for raw_date, article_id in conn.execute("SELECT date, article_id FROM time_machine_dates").fetchall():
+                iso_date = normalize_date(raw_date)
+                if iso_date != raw_date:
+                    conn.execute("DELETE FROM time_machine_dates WHERE date = ?", (raw_date,))
+                    if iso_date is not None:
+                        conn.execute("INSERT OR IGNORE INTO time_machine_dates (date, article_id) VALUES (?, ?)",
+                                     (iso_date, article_id))
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def get_entry(self, article_id: int) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM time_machine_entries WHERE article_id = ?", (article_id,)).fetchone()
+        return self._to_entry(row)
+
+    def get_by_date(self, date: str) -> Optional[dict]:
+        date = normalize_date(date)
+        if date is None:
+            return None
+        with self._connect() as conn:
+            row = conn.execute("""
+                SELECT e.* FROM time_machine_dates d
+                JOIN time_machine_entries e ON e.article_id = d.article_id
+                WHERE d.date = ?
+            """, (date,)).fetchone()
+        return self._to_entry(row)
+
+    def put_entry(self, entry: dict):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO time_machine_entries (article_id, title, publish_date, source, quote, image_base64, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (entry["id"], entry["title"], entry["publish_date"], entry["source"], entry["quote"], entry["image_base64"], time.time())
+            )
+
+    def put_date(self, date: str, article_id: int):
+        iso_date = normalize_date(date)
+        if iso_date is None:
+            raise ValueError(f"Unparseable date: {date!r}")
+        date = iso_date
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO time_machine_dates (date, article_id) VALUES (?, ?)", (date, article_id))
+
+    def random_entries(self, limit: int) -> List[dict]:
+        """Stored complete entries in random order (the table only holds generated entries, so it stays small)."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM time_machine_entries WHERE image_base64 IS NOT NULL ORDER BY RANDOM() LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def known_dates(self) -> set:
+        with self._connect() as conn:
+            return {row[0] for row in conn.execute("SELECT date FROM time_machine_dates")}
+
+    @staticmethod
+    def _to_entry(row) -> Optional[dict]:
+        if row is None:
+            return None
+        return {
+            "id": row["article_id"],
+            "title": row["title"],
+            "publish_date": row["publish_date"],
+            "source": row["source"],
+            "quote": row["quote"],
+            "image_base64": row["image_base64"],
+        }
+
+time_machine_store = TimeMachineStore(TIME_MACHINE_DB_PATH)
+time_machine_pool = asyncio.Queue(maxsize=TIME_MACHINE_POOL_SIZE)
+time_machine_refill = asyncio.Event()
+
+def random_article_id(conn) -> Optional[int]:
+    """Rowid sampling: pick a random point in [min_id, max_id] and take the first id at or after it (O(log n))."""
+    # Two scalar subqueries: a combined MIN(id), MAX(id) disables the min/max optimization and scans the table
+    low, high = conn.execute("SELECT (SELECT MIN(id) FROM articles), (SELECT MAX(id) FROM articles)").fetchone()
+    if low is None:
+        return None
+    row = conn.execute("SELECT id FROM articles WHERE id >= ? ORDER BY id LIMIT 1", (random.randint(low, high),)).fetchone()
+    return row[0] if row else low
+
+def nearest_article_id(conn, day: int) -> Optional[int]:
+    """Two indexed range probes on date_day (first on/after, last on/before) instead of sorting the whole table."""
+    after = conn.execute("SELECT id, date_day FROM articles WHERE date_day >= ? ORDER BY date_day ASC LIMIT 1", (day,)).fetchone()
+    before = conn.execute("SELECT id, date_day FROM articles WHERE date_day <= ? ORDER BY date_day DESC LIMIT 1", (day,)).fetchone()
+    candidates = [row for row in (after, before) if row is not None]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda row: abs(row["date_day"] - day))["id"]
+
+def select_time_machine_article(date: Optional[str] = None):
+    """Picks the article closest to `date`, or a random one when no date is given."""
+    with db_pool.connection() as conn:
+        if not HAS_DATE_DAY:
+            return legacy_select_time_machine_article(conn, date)
+
+        article_id = None
+        if date:
+            day = parse_date_day(date)
+            if day is None:
+                print(f"⚠️ Invalid date '{date}', falling back to random")
+            else:
+                article_id = nearest_article_id(conn, day)
+        if article_id is None:
+            article_id = random_article_id(conn)
+        if article_id is None:
+            return None
+
+        row = conn.execute("SELECT * FROM articles WHERE id = ?", (article_id,)).fetchone()
+    return dict(row) if row else None
+
+def legacy_select_time_machine_article(conn, date: Optional[str] = None):
+    """Full-scan selection for databases built before the date_day column existed."""
     cursor = conn.cursor()
     
-    # 1. Select Article
     if date:
         # Find the article CLOSEST to the specified date
         # Uses SQLite's julianday to calculate absolute difference in days
@@ -488,15 +1245,22 @@ async def time_machine(date: Optional[str] = None):
         cursor.execute("SELECT * FROM articles ORDER BY RANDOM() LIMIT 1")
     
     row = cursor.fetchone()
-    conn.close()
+    return dict(row) if row else None
 
-    if not row:
-        raise HTTPException(status_code=404, detail="No articles found in database")
+def list_publish_dates() -> List[str]:
+    """Distinct well-formed publish dates, newest first (used to precompute the per-date mapping)."""
+    rows = db_pool.fetchall(
+        "SELECT DISTINCT publish_date FROM articles WHERE publish_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]' "
+        "ORDER BY publish_date DESC"
+    )
+    return [row[0] for row in rows]
 
+async def generate_time_machine_entry(row: dict) -> dict:
+    """Runs the quote LLM call and the image generation for one article."""
     article_title = row["title"]
-    article_content = row["content"][:500] # Use snippet for context
+    article_content = (row["content"] or "")[:500] # Use snippet for context
 
-    # 2. Extract a Quote (using existing LangChain LLM for speed)
+    # 1. Extract a Quote (using existing LangChain LLM for speed)
     quote_prompt = PromptTemplate.from_template(
         "从以下文章片段中提取一句最有哲理、最打动人或最核心的金句（不超过30字）。\n"
         "如果没有合适的，就基于标题创作一句富有商业洞察力的短句。\n"
@@ -504,11 +1268,11 @@ async def time_machine(date: Optional[str] = None):
     )
     quote_chain = quote_prompt | llm | StrOutputParser()
     try:
-        quote = quote_chain.invoke({"title": article_title, "content": article_content}).strip()
+        quote = (await quote_chain.ainvoke({"title": article_title, "content": article_content})).strip()
     except:
         quote = article_title
 
-    # 3. Generate Image (STRICTLY using gemini-3-pro-image-preview as requested)
+    # 2. Generate Image (STRICTLY using gemini-3-pro-image-preview as requested)
     image_base64 = None
     try:
         print(f"🎨 Generating Time Machine image using gemini-3-pro-image-preview for: {article_title}")
@@ -523,7 +1287,8 @@ async def time_machine(date: Optional[str] = None):
         )
         
         # Removed aspect_ratio from config as it caused validation error
-        response = genai_client.models.generate_content(
+        # Async client: the image round-trip no longer blocks other requests
+        response = await genai_client.aio.models.generate_content(
             model='gemini-3-pro-image-preview',
             contents=[prompt],
         )
@@ -542,14 +1307,103 @@ async def time_machine(date: Optional[str] = None):
     except Exception as e:
         print(f"❌ Image generation failed with gemini-3-pro-image-preview: {e}")
 
-    return TimeMachineResponse(
-        id=row["id"],
-        title=row["title"],
-        publish_date=row["publish_date"],
-        source=row["source"],
-        quote=quote,
-        image_base64=image_base64
-    )
+    entry = {
+        "id": row["id"],
+        "title": row["title"],
+        "publish_date": row["publish_date"],
+        "source": row["source"],
+        "quote": quote,
+        "image_base64": image_base64,
+    }
+    # Only complete entries are persisted, so a failed image gets retried next time
+    if image_base64:
+        await run_blocking(time_machine_store.put_entry, entry)
+    return entry
+
+async def entry_for_date(date: str) -> Optional[dict]:
+    """Resolves a date to its nearest article and returns a stored or freshly generated entry."""
+    row = await run_blocking(select_time_machine_article, date)
+    if not row:
+        return None
+    entry = await run_blocking(time_machine_store.get_entry, row["id"])
+    if entry is None:
+        entry = await generate_time_machine_entry(row)
+    if entry["image_base64"]:
+        await run_blocking(time_machine_store.put_date, date, row["id"])
+    return entry
+
+async def time_machine_producer():
+    """
+    Background task: fills the random pool from stored entries first (so a restart does not pay for
+    new images), tops up the shortfall, then (optionally) precomputes the per-date mapping.
+    """
+    try:
+        for entry in await run_blocking(time_machine_store.random_entries, TIME_MACHINE_POOL_SIZE):
+            time_machine_pool.put_nowait(entry)
+        print(f"⏳ Time Machine pool seeded from storage: {time_machine_pool.qsize()}/{TIME_MACHINE_POOL_SIZE}")
+    except Exception as e:
+        print(f"⚠️ Could not seed Time Machine pool from storage: {e}")
+
+    pending_dates = None
+    while True:
+        try:
+            if not time_machine_pool.full():
+                row = await run_blocking(select_time_machine_article, None)
+                if row is None:
+                    await asyncio.sleep(60)
+                    continue
+                entry = await run_blocking(time_machine_store.get_entry, row["id"])
+                time_machine_pool.put_nowait(entry or await generate_time_machine_entry(row))
+                print(f"⏳ Time Machine pool: {time_machine_pool.qsize()}/{TIME_MACHINE_POOL_SIZE}")
+                continue
+
+            if TIME_MACHINE_PRECOMPUTE_DATES:
+                if pending_dates is None:
+                    known = await run_blocking(time_machine_store.known_dates)
+                    pending_dates = [d for d in await run_blocking(list_publish_dates) if d not in known]
+                if pending_dates:
+                    await entry_for_date(pending_dates.pop(0))
+                    continue
+
+            # Pool is full and nothing left to precompute: sleep until a request consumes an entry
+            time_machine_refill.clear()
+            await time_machine_refill.wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Time Machine producer error: {e}")
+            await asyncio.sleep(10)
+
+@app.on_event("startup")
+async def start_time_machine_producer():
+    if TIME_MACHINE_POOL_SIZE > 0:
+        asyncio.create_task(time_machine_producer())
+
+@app.get("/api/time_machine", response_model=TimeMachineResponse)
+async def time_machine(date: Optional[str] = None):
+    if date:
+        iso_date = normalize_date(date)
+        if iso_date is None:
+            raise HTTPException(status_code=400, detail=f"Unrecognized date: {date}")
+        date = iso_date
+        # 1. Precomputed per-date mapping -> single SQLite lookup
+        entry = await run_blocking(time_machine_store.get_by_date, date)
+        if entry is None:
+            entry = await entry_for_date(date)
+    else:
+        # 2. Ready-made random entry from the pool; live generation only when the pool is empty
+        try:
+            entry = time_machine_pool.get_nowait()
+        except asyncio.QueueEmpty:
+            print("⚠️ Time Machine pool empty, generating live.")
+            row = await run_blocking(select_time_machine_article, None)
+            entry = await generate_time_machine_entry(row) if row else None
+        time_machine_refill.set()
+
+    if not entry:
+        raise HTTPException(status_code=404, detail="No articles found in database")
+
+    return TimeMachineResponse(**entry)
 
 if __name__ == "__main__":
     import uvicorn
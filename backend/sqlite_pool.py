@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import queue
+import threading
+from contextlib import contextmanager
+
+# Read-side tuning applied to every pooled connection
+READ_PRAGMAS = (
+    "PRAGMA mmap_size = 268435456",  # 256 MB memory-mapped reads (no read() syscalls + page copies)
+    "PRAGMA cache_size = -65536",    # 64 MB page cache per connection (negative = KiB)
+    "PRAGMA temp_store = MEMORY",    # Sorts / temp b-trees stay in RAM
+    "PRAGMA query_only = 1",         # Hard guarantee that request handlers never write
+)
+
+class SQLiteReadPool:
+    """
+    Fixed-size pool of read-only SQLite connections shared by all request handlers.
+    Connections are opened lazily, reused across requests (keeping their page cache and
+    prepared-statement cache warm) and must only be used from worker threads, never the event loop.
+    `enable_wal=False` leaves the journal mode alone (read-only build artifacts such as chunk stores).
+    """
+    def __init__(self, db_path: str, size: int = 8, cached_statements: int = 256, enable_wal: bool = True):
+        self.db_path = db_path
+        self.size = size
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue()  # LIFO: the most recently used (warmest) connection goes out first
+        self._opened = 0
+        self._lock = threading.Lock()
+        if enable_wal:
+            self._enable_wal()
+
+    def _enable_wal(self):
+        # WAL is persistent in the DB file and lets readers run concurrently with a writer.
+        # It needs a writable handle, so it is set once here rather than on the read-only connections.
+        if not os.path.exists(self.db_path):
+            return  # A writable connect would create an empty database file
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ Could not enable WAL on {self.db_path}: {e}")
+
+    def _open(self):
+        conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro",
+            uri=True,
+            check_same_thread=False,  # Connections move between executor threads (one user at a time)
+            cached_statements=self.cached_statements,
+            timeout=5,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in READ_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._opened -= 1
+                    raise
+        return self._idle.get()
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def fetchone(self, sql: str, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def fetchall(self, sql: str, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
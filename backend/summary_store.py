@@ -0,0 +1,85 @@
+import sqlite3
+import hashlib
+import time
+from typing import Optional
+
+# Shared by backend/main.py (fill on first use) and precompute_summaries.py (offline bulk job),
+# so both sides compute identical content hashes and prompt versions.
+
+SUMMARY_MODEL = "gemini-2.5-pro"
+SUMMARY_MAX_CHARS = 20000  # Only the first 20k chars are sent to the LLM
+
+SUMMARY_PROMPT = (
+    "任务：对以下文章进行【高保真浓缩摘要】。\n\n"
+    "文章标题：{title}\n"
+    "文章内容：\n{content}\n\n"
+    "【严格约束】：\n"
+    "1. **禁止废话**：严禁出现“好的同学们”、“这篇文章讲了...”、“导读如下”等任何开场白或结束语。直接开始输出正文。\n"
+    "2. **禁止分析**：不要发表评论、不要进行价值判断、不要分析其意义。只陈述原文的事实和观点。\n"
+    "3. **结构还原**：严格按照原文的逻辑结构和段落顺序进行缩写。保留原文的小标题（如果有）。\n"
+    "4. **段落间距**：每一段文字结束后，必须空一行，以确保阅读排版清晰。\n"
+    "5. **长度与细节**：保留原文约 50%-70% 的篇幅。保留所有关键数据、具体案例、人名和核心论据。不要写成短小的提纲，要写成一篇流畅的短文章。\n"
+    "6. **格式**：使用 Markdown 格式。小标题使用 ##，重点内容使用 **加粗**。\n\n"
+    "输出内容："
+)
+
+# Editing the prompt or switching model changes the version, so stale summaries are never served
+SUMMARY_PROMPT_VERSION = hashlib.sha256(f"{SUMMARY_PROMPT}\x1f{SUMMARY_MODEL}".encode("utf-8")).hexdigest()[:12]
+
+def summary_input(title: str, content: str) -> dict:
+    """The exact variables fed to SUMMARY_PROMPT."""
+    return {"title": title or "", "content": (content or "")[:SUMMARY_MAX_CHARS]}
+
+def content_hash(title: str, content: str) -> str:
+    """Hash of what the LLM actually sees; any edit to the article invalidates its summary."""
+    data = summary_input(title, content)
+    return hashlib.sha256(f"{data['title']}\x1f{data['content']}".encode("utf-8")).hexdigest()
+
+class SummaryStore:
+    """
+    `article_summaries` table keyed by (article_id, content_hash, prompt_version).
+    Every call opens its own short-lived connection so the store is safe to use from worker threads.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS article_summaries (
+                    article_id INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (article_id, content_hash, prompt_version)
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(self, article_id: int, digest: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT summary FROM article_summaries WHERE article_id = ? AND content_hash = ? AND prompt_version = ?",
+                (article_id, digest, SUMMARY_PROMPT_VERSION)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, article_id: int, digest: str, summary: str):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO article_summaries (article_id, content_hash, prompt_version, model, summary, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (article_id, digest, SUMMARY_PROMPT_VERSION, SUMMARY_MODEL, summary, time.time())
+            )
+
+    def done_keys(self) -> set:
+        """(article_id, content_hash) pairs already summarised under the current prompt version."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT article_id, content_hash FROM article_summaries WHERE prompt_version = ?",
+                (SUMMARY_PROMPT_VERSION,)
+            ).fetchall()
+        return {(row[0], row[1]) for row in rows}
@@ -0,0 +1,233 @@
+import os
+import json
+import math
+import sqlite3
+import faiss
+from langchain_core.documents import Document
+
+try:
+    from backend.sqlite_pool import SQLiteReadPool
+except ImportError:  # Running from inside backend/
+    from sqlite_pool import SQLiteReadPool
+
+# Serving layout of an index directory (no pickle):
+#   index.faiss  -> vectors, memory-mapped at load time
+#   chunks.db    -> SQLite `chunks` table: vector_id (= FAISS position) -> chunk text + metadata
+#   build.json   -> build id the directory was published with, and the size of every .faiss file in it
+INDEX_FILE_NAME = "index.faiss"
+CHUNKS_DB_NAME = "chunks.db"
+BUILD_INFO_NAME = "build.json"
+
+# Published builds under the index root (faiss_index/):
+#   builds/<build id>/  -> a complete serving tree (index dir or shards/, articles/), never modified after publishing
+#   CURRENT             -> build id being served, replaced atomically to publish the next build
+# A root without CURRENT is the older unversioned layout, served in place.
+BUILDS_DIR_NAME = "builds"
+CURRENT_BUILD_FILE = "CURRENT"
+
+# Approximate index variants, written next to the exact index as index_<type>.faiss.
+# They are built from the same vectors in the same order, so positions (and chunks.db ids) are shared.
+ANN_INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw", "sq8", "ivf_sq8")
+
+def ann_index_file(index_type: str) -> str:
+    return INDEX_FILE_NAME if index_type == "flat" else f"index_{index_type}.faiss"
+
+def default_nlist(n: int) -> int:
+    """~4*sqrt(n) IVF cells, capped so each centroid gets >= 39 training points (faiss' minimum)."""
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+def factory_string(index_type: str, n: int, d: int, nlist: int = None, pq_m: int = 64, hnsw_m: int = 32) -> str:
+    nlist = nlist or default_nlist(n)
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},Flat"
+    if index_type == "ivf_pq":
+        # PQ sub-quantizers must divide the dimension
+        m = next(m for m in (pq_m, 96, 64, 48, 32, 16, 8, 4, 2, 1) if d % m == 0)
+        # 8-bit codebooks need 256 * 39 training points; small corpora/shards fall back to 4-bit
+        nbits = 8 if n >= 256 * 39 else 4
+        return f"IVF{nlist},PQ{m}x{nbits}"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m}"
+    if index_type == "sq8":
+        return "SQ8"
+    if index_type == "ivf_sq8":
+        return f"IVF{nlist},SQ8"
+    raise ValueError(f"Unknown index type: {index_type}")
+
+def build_ann_index(vectors, index_type: str, **kwargs):
+    """Trains (if needed) and fills an L2 index of the given type from float32 vectors."""
+    n, d = vectors.shape
+    index = faiss.index_factory(d, factory_string(index_type, n, d, **kwargs), faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+def search_params(index, nprobe: int = None, ef_search: int = None):
+    """Per-call query-time knobs (thread-safe, unlike setting index.nprobe globally); None for exact indexes."""
+    if nprobe:
+        try:
+            faiss.extract_index_ivf(index)
+            return faiss.SearchParametersIVF(nprobe=nprobe)
+        except Exception:
+            pass
+    if ef_search and isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=ef_search)
+    return None
+
+def published_build(root: str):
+    """(serving directory, build id) under an index root; (root, None) for the unversioned layout."""
+    current_path = os.path.join(root, CURRENT_BUILD_FILE)
+    if not os.path.exists(current_path):
+        return root, None
+    with open(current_path, "r", encoding="utf-8") as f:
+        build_id = f.read().strip()
+    return os.path.join(root, BUILDS_DIR_NAME, build_id), build_id
+
+def read_build_info(index_dir: str):
+    path = os.path.join(index_dir, BUILD_INFO_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def write_build_info(index_dir: str, build_id: str):
+    """Build side: records the build id and the size of every .faiss file, written by rename."""
+    files = {name: os.path.getsize(os.path.join(index_dir, name))
+             for name in sorted(os.listdir(index_dir)) if name.endswith(".faiss")}
+    path = os.path.join(index_dir, BUILD_INFO_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"build_id": build_id, "files": files}, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+def stamp_chunk_store(db_path: str, build_id: str):
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS build_info (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("INSERT OR REPLACE INTO build_info (key, value) VALUES ('build_id', ?)", (build_id,))
+    conn.commit()
+    conn.close()
+
+def has_chunk_store(index_dir: str) -> bool:
+    return os.path.exists(os.path.join(index_dir, CHUNKS_DB_NAME)) and os.path.exists(os.path.join(index_dir, INDEX_FILE_NAME))
+
+def write_chunk_store(index_dir: str, rows) -> int:
+    """
+    Build side: writes `chunks.db` from (vector_id, chunk_id, page_content, metadata) rows and returns the row count.
+    `chunk_id` is the build's stable content-hash id, which the next incremental build diffs against.
+    Written to a temp file and renamed so a serving process never sees a half-written table.
+    """
+    final_path = os.path.join(index_dir, CHUNKS_DB_NAME)
+    tmp_path = final_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("""
+        CREATE TABLE chunks (
+            vector_id INTEGER PRIMARY KEY,
+            chunk_id TEXT,
+            article_id INTEGER,
+            page_content TEXT NOT NULL,
+            metadata TEXT NOT NULL
+        )
+    """)
+    cursor = conn.executemany(
+        "INSERT INTO chunks (vector_id, chunk_id, article_id, page_content, metadata) VALUES (?, ?, ?, ?, ?)",
+        ((vector_id, chunk_id, metadata.get("article_id"), text, json.dumps(metadata, ensure_ascii=False))
+         for vector_id, chunk_id, text, metadata in rows)
+    )
+    count = cursor.rowcount
+    conn.execute("CREATE INDEX idx_chunks_article ON chunks (article_id)")
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, final_path)
+    return count
+
+def read_index_mmap(path: str):
+    """Memory-maps the FAISS index when this faiss build supports it, otherwise reads it into RAM."""
+    for flag_name in ("IO_FLAG_MMAP_IFC", "IO_FLAG_MMAP"):
+        flag = getattr(faiss, flag_name, None)
+        if flag is None:
+            continue
+        try:
+            return faiss.read_index(path, flag | faiss.IO_FLAG_READ_ONLY)
+        except Exception:
+            continue
+    print(f"⚠️ faiss cannot mmap {path}, loading into memory")
+    return faiss.read_index(path)
+
+class _IdentityIds:
+    """index_to_docstore_id stand-in: the FAISS position *is* the chunk's vector_id."""
+    def __getitem__(self, idx):
+        return int(idx)
+
+class SQLiteDocstore:
+    """Lazy docstore: only the requested hits are read from `chunks.db`."""
+    def __init__(self, db_path: str, pool_size: int = 4):
+        # chunks.db is written once by the build and never modified, so it keeps its own journal mode
+        self.pool = SQLiteReadPool(db_path, size=pool_size, enable_wal=False)
+
+    def search(self, vector_id: int):
+        row = self.pool.fetchone("SELECT page_content, metadata FROM chunks WHERE vector_id = ?", (vector_id,))
+        if row is None:
+            return f"ID {vector_id} not found."  # Same contract as LangChain's InMemoryDocstore
+        return Document(page_content=row["page_content"], metadata=json.loads(row["metadata"]))
+
+    def count(self) -> int:
+        return self.pool.fetchone("SELECT COUNT(*) AS n FROM chunks")["n"]
+
+    def build_id(self):
+        if self.pool.fetchone("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'build_info'") is None:
+            return None
+        row = self.pool.fetchone("SELECT value FROM build_info WHERE key = 'build_id'")
+        return row["value"] if row else None
+
+class MmapFaissStore:
+    """
+    Read-only vector store exposing the attributes the backend search code uses on LangChain's FAISS
+    (`index`, `docstore.search`, `index_to_docstore_id`), backed by an mmapped index + SQLite chunks.
+    No pickle is involved, so `allow_dangerous_deserialization` is not needed.
+    """
+    _normalize_L2 = False
+
+    def __init__(self, index_dir: str, pool_size: int = 4, index_type: str = "flat", build_id: str = None):
+        """
+        Stamped directories (build.json) must agree with chunks.db and with `build_id` (the published
+        build being served), otherwise positions may point at other chunks' text and loading is refused.
+        A variant is only served when build.json lists it at its current size; else the exact index is used.
+        """
+        self.docstore = SQLiteDocstore(os.path.join(index_dir, CHUNKS_DB_NAME), pool_size=pool_size)
+        exact_path = os.path.join(index_dir, INDEX_FILE_NAME)
+        info = read_build_info(index_dir)
+        if info is not None:
+            chunks_build = self.docstore.build_id()
+            if chunks_build != info["build_id"] or (build_id is not None and info["build_id"] != build_id):
+                raise ValueError(f"{index_dir} is inconsistent: build.json {info['build_id']}, "
+                                 f"chunks.db {chunks_build}, published {build_id}")
+            if info["files"].get(INDEX_FILE_NAME) != os.path.getsize(exact_path):
+                raise ValueError(f"{exact_path} was modified after build {info['build_id']} was published")
+        elif build_id is not None:
+            raise ValueError(f"{index_dir} has no {BUILD_INFO_NAME} but belongs to published build {build_id}")
+
+        index_path = os.path.join(index_dir, ann_index_file(index_type))
+        if not os.path.exists(index_path):
+            print(f"⚠️ {index_path} not built, using exact index")
+            index_path = exact_path
+        elif index_path != exact_path and info is None:
+            # Unstamped (pre build id) directory: a variant may be left over from another build
+            print(f"⚠️ {index_dir} has no {BUILD_INFO_NAME}, using exact index (rebuild to serve {index_type})")
+            index_path = exact_path
+        elif index_path != exact_path and info["files"].get(ann_index_file(index_type)) != os.path.getsize(index_path):
+            print(f"⚠️ {index_path} is not part of build {info['build_id']}, using exact index")
+            index_path = exact_path
+        self.index = read_index_mmap(index_path)
+        try:
+            # IVF indexes need a direct map for reconstruct() (used by the two-stage rerank)
+            faiss.extract_index_ivf(self.index).make_direct_map()
+        except Exception:
+            pass
+        self.index_to_docstore_id = _IdentityIds()
@@ -0,0 +1,79 @@
+import os
+import time
+import argparse
+import numpy as np
+import faiss
+
+from backend.vector_store import build_ann_index, search_params, published_build, ANN_INDEX_TYPES
+
+# Paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FAISS_DB_DIR = os.path.join(BASE_DIR, 'faiss_index')
+
+# Query-time knob sweeps per family
+NPROBE_SWEEP = [1, 4, 16, 64]
+EF_SEARCH_SWEEP = [16, 64, 256]
+
+def load_vectors(index_dir):
+    index = faiss.read_index(os.path.join(index_dir, "index.faiss"))
+    print(f"Loaded {index.ntotal} vectors (dim {index.d}) from {index_dir}")
+    return index.reconstruct_n(0, index.ntotal)
+
+def recall_at_k(found, truth, k):
+    hits = sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+def knob_settings(index_type):
+    if index_type.startswith("ivf"):
+        return [{"nprobe": n} for n in NPROBE_SWEEP]
+    if index_type == "hnsw":
+        return [{"ef_search": ef} for ef in EF_SEARCH_SWEEP]
+    return [{}]
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k / QPS / size benchmark of FAISS index variants on our corpus")
+    parser.add_argument("--index-dir", default=published_build(FAISS_DB_DIR)[0],
+                        help="Directory with the exact index.faiss (default: the published build)")
+    parser.add_argument("--types", nargs="+", choices=ANN_INDEX_TYPES, default=list(ANN_INDEX_TYPES))
+    parser.add_argument("--queries", type=int, default=500, help="Chunk vectors held out as queries")
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.index_dir)
+
+    # Hold out real chunk vectors as queries so no query trivially finds itself
+    rng = np.random.default_rng(42)
+    order = rng.permutation(len(vectors))
+    queries = np.ascontiguousarray(vectors[order[:args.queries]])
+    base = np.ascontiguousarray(vectors[order[args.queries:]])
+
+    exact = faiss.IndexFlatL2(base.shape[1])
+    exact.add(base)
+    _, truth = exact.search(queries, args.k)
+
+    print("=" * 78)
+    print(f"{len(base)} base vectors | {len(queries)} queries | recall@{args.k} vs exact flat search")
+    print("=" * 78)
+    print(f"{'type':<10} {'knobs':<14} {'recall':>8} {'QPS':>10} {'size(MB)':>10} {'build(s)':>9}")
+
+    for index_type in args.types:
+        start = time.time()
+        index = build_ann_index(base, index_type)
+        build_seconds = time.time() - start
+        size_mb = faiss.serialize_index(index).nbytes / 1024 / 1024
+
+        for knobs in knob_settings(index_type):
+            params = search_params(index, **knobs)
+            start = time.perf_counter()
+            if params is not None:
+                _, found = index.search(queries, args.k, params=params)
+            else:
+                _, found = index.search(queries, args.k)
+            elapsed = time.perf_counter() - start
+
+            label = ",".join(f"{k}={v}" for k, v in knobs.items()) or "-"
+            print(f"{index_type:<10} {label:<14} {recall_at_k(found, truth, args.k):>8.3f} "
+                  f"{len(queries) / elapsed:>10.0f} {size_mb:>10.1f} {build_seconds:>9.1f}")
+
+if __name__ == "__main__":
+    main()
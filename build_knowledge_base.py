@@ -1,5 +1,12 @@
 import os
+import json
+import time
+import hashlib
 import sqlite3
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.date_utils import parse_date_day
 
 # Configuration
 BASE_DIR = os.getcwd()
@@ -7,15 +14,61 @@ NEWS_DIR = os.path.join(BASE_DIR, 'Fudan_News_Data')   # Changed from Media to N
 WECHAT_DIR = os.path.join(BASE_DIR, 'Fudan_Wechat_Data')
 BUSINESS_DIR = os.path.join(BASE_DIR, 'Fudan_Business_Knowledge_Data')
 DB_NAME = 'fudan_knowledge_base.db'
+SNIPPET_LENGTH = 200  # Precomputed list-view snippet, so list queries never read full article bodies
+INSERT_BATCH_SIZE = 1000  # Rows per executemany() call
+PARSE_CHUNKSIZE = 64  # Files handed to a parser process at a time
+# Incremental runs write the ids they created/updated/deleted here for the vector index builders
+CHANGESET_DIR = os.path.join(BASE_DIR, 'ingest_changesets')
+
+# Bulk-load tuning: WAL + relaxed fsync, big page cache, temp b-trees in RAM
+BUILD_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -262144",  # 256 MB (negative = KiB)
+    "PRAGMA temp_store = MEMORY",
+)
+
+def short_ngrams(text):
+    """
+    Every 1- and 2-character run of letters/digits in `text`, lowercased and space-separated
+    ("复旦大学" -> "复 复旦 旦 旦大 大 大学 学"): the token stream articles_ngram indexes.
+    """
+    if not text:
+        return ''
+    text = text.lower()
+    tokens = []
+    for i, char in enumerate(text):
+        if not char.isalnum():
+            continue
+        tokens.append(char)
+        if i + 1 < len(text) and text[i + 1].isalnum():
+            tokens.append(text[i:i + 2])
+    return ' '.join(tokens)
+
+def connect_db():
+    conn = sqlite3.connect(DB_NAME)
+    for pragma in BUILD_PRAGMAS:
+        conn.execute(pragma)
+    # The articles_ngram triggers call this, so every connection that writes `articles` needs it
+    conn.create_function('short_ngrams', 1, short_ngrams, deterministic=True)
+    return conn
 
 def init_db():
     """Initialize the SQLite database with the required schema."""
-    conn = sqlite3.connect(DB_NAME)
+    conn = connect_db()
     cursor = conn.cursor()
     
     # Drop table if exists to ensure clean state
+    cursor.execute('DROP TABLE IF EXISTS articles_fts')
+    cursor.execute('DROP TABLE IF EXISTS articles_ngram')
     cursor.execute('DROP TABLE IF EXISTS articles')
+    cursor.execute('DROP TABLE IF EXISTS ingest_files')
     
+    create_schema(cursor)
+    conn.commit()
+    return conn
+
+def create_schema(cursor):
     cursor.execute('''
         CREATE TABLE articles (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -23,12 +76,183 @@ def init_db():
             title TEXT,
             publish_date TEXT,
             link TEXT,
-            content TEXT
+            content TEXT,
+            snippet TEXT,
+            date_day INTEGER,  -- publish_date parsed to a day number (NULL when unparseable), indexed for range probes
+            article_key TEXT,  -- link, or "sha1:<hash>" without one: what an upsert matches on, so ids survive re-ingests
+            content_hash TEXT  -- hash of title/date/content, to tell a real edit from a touched file
+        )
+    ''')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_articles_key ON articles (article_key)')
+    create_ingest_manifest(cursor)
+    create_fts_index(cursor)
+    create_ngram_index(cursor)
+
+def create_ingest_manifest(cursor):
+    """Every ingested content.txt with the stat it had, so incremental runs only re-parse new or changed files."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ingest_files (
+            path TEXT PRIMARY KEY,  -- relative to BASE_DIR
+            source TEXT NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            article_key TEXT
         )
     ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ingest_files_key ON ingest_files (article_key)')
+
+def open_incremental_db():
+    """
+    Opens the existing DB for an upsert run (creating it if missing). Databases built before
+    article keys existed get the columns added and backfilled in place, keeping their ids.
+    """
+    conn = connect_db()
+    cursor = conn.cursor()
+    tables = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if 'articles' not in tables:
+        create_schema(cursor)
+        create_fts_triggers(cursor)
+        conn.commit()
+        return conn
+
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(articles)")}
+    if 'snippet' not in columns or 'date_day' not in columns:
+        # Baseline databases predate the list-view columns that upserts and list indexes rely on
+        print("Adding snippet/date_day columns to the existing database...")
+        if 'snippet' not in columns:
+            cursor.execute('ALTER TABLE articles ADD COLUMN snippet TEXT')
+        if 'date_day' not in columns:
+            cursor.execute('ALTER TABLE articles ADD COLUMN date_day INTEGER')
+        cursor.executemany(
+            'UPDATE articles SET snippet = ?, date_day = ? WHERE id = ?',
+            ((content[:SNIPPET_LENGTH] if content is not None else None, parse_date_day(publish_date), article_id)
+             for article_id, publish_date, content in
+             cursor.execute('SELECT id, publish_date, content FROM articles').fetchall())
+        )
+    if 'article_key' not in columns:
+        print("Adding article keys to the existing database (ids are kept)...")
+        cursor.execute('ALTER TABLE articles ADD COLUMN article_key TEXT')
+        cursor.execute('ALTER TABLE articles ADD COLUMN content_hash TEXT')
+        seen = set()
+        updates = []
+        for article_id, title, publish_date, link, content in cursor.execute(
+                'SELECT id, title, publish_date, link, content FROM articles ORDER BY id').fetchall():
+            key = article_key(link, title or '', content or '')
+            if key in seen:
+                key = f"{key}#{article_id}"  # Duplicate crawl of the same article: keep the row, never matched again
+            seen.add(key)
+            updates.append((key, content_hash(title or '', publish_date or '', content or ''), article_id))
+        cursor.executemany('UPDATE articles SET article_key = ?, content_hash = ? WHERE id = ?', updates)
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_articles_key ON articles (article_key)')
+    create_ingest_manifest(cursor)
+    if 'articles_fts' not in tables:
+        create_fts_index(cursor)
+        cursor.execute("INSERT INTO articles_fts(articles_fts) VALUES('rebuild')")
+    if 'articles_ngram' not in tables:
+        print("Adding the short-keyword index to the existing database...")
+        create_ngram_index(cursor)
+        fill_ngram_index(cursor)
+    create_fts_triggers(cursor)
     conn.commit()
     return conn
 
+def create_fts_index(cursor):
+    """
+    FTS5 full-text index over title/content for /api/sql_search.
+    The trigram tokenizer matches any substring of 3+ characters, which works for Chinese without word segmentation.
+    It is an external-content table (no duplicated text), filled in one pass after the bulk load
+    and then kept in sync with `articles` by triggers (see create_fts_triggers).
+    """
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+            title, content,
+            content='articles', content_rowid='id',
+            tokenize='trigram'
+        )
+    ''')
+
+def create_ngram_index(cursor):
+    """
+    Companion index for 1-2 character keywords, which trigrams cannot match: each row holds the
+    short_ngrams() tokens of the article, split by unicode61, so a short keyword is one token lookup.
+    Contentless (the text lives in `articles`) and detail=column (keywords are single tokens, no positions needed).
+    """
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS articles_ngram USING fts5(
+            title, content,
+            content='', detail=column,
+            tokenize='unicode61'
+        )
+    ''')
+
+def fill_ngram_index(cursor):
+    cursor.execute('''
+        INSERT INTO articles_ngram(rowid, title, content)
+        SELECT id, short_ngrams(title), short_ngrams(content) FROM articles
+    ''')
+
+def create_fts_triggers(cursor):
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_fts_ai AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_fts_ad AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts(articles_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_fts_au AFTER UPDATE ON articles BEGIN
+            INSERT INTO articles_fts(articles_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO articles_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+    ''')
+    # Contentless: a delete must re-supply the tokens that were indexed, hence short_ngrams(old.*)
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_ngram_ai AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_ngram(rowid, title, content) VALUES (new.id, short_ngrams(new.title), short_ngrams(new.content));
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_ngram_ad AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_ngram(articles_ngram, rowid, title, content)
+            VALUES ('delete', old.id, short_ngrams(old.title), short_ngrams(old.content));
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_ngram_au AFTER UPDATE ON articles BEGIN
+            INSERT INTO articles_ngram(articles_ngram, rowid, title, content)
+            VALUES ('delete', old.id, short_ngrams(old.title), short_ngrams(old.content));
+            INSERT INTO articles_ngram(rowid, title, content) VALUES (new.id, short_ngrams(new.title), short_ngrams(new.content));
+        END
+    ''')
+
+def create_list_indexes(conn, analyze=True):
+    """
+    Covering indexes for the list endpoints: (source, publish_date) serves `WHERE source = ? ORDER BY publish_date DESC LIMIT n`
+    as an index walk instead of a full sort, and carrying id/title/snippet means the table row
+    (with its multi-KB content overflow pages) is never touched.
+    Created after the bulk load, which is faster than maintaining them row by row.
+    """
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_source_date
+        ON articles (source, publish_date, id, title, snippet)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_date
+        ON articles (publish_date, source, id, title, snippet)
+    ''')
+    # Nearest-date lookups (time machine) become two O(log n) range probes on this index
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_date_day
+        ON articles (date_day)
+    ''')
+    if analyze:
+        cursor.execute('ANALYZE')
+    conn.commit()
+
 def parse_content_file(file_path):
     """
     Parses a content.txt file to extract metadata and body.
@@ -71,60 +295,245 @@ def parse_content_file(file_path):
     
     return data
 
-def process_directory(conn, source_name, root_dir):
+def article_key(link, title, content):
+    return link if link else "sha1:" + hashlib.sha1(f"{title}\n{content}".encode('utf-8')).hexdigest()
+
+def content_hash(title, publish_date, content):
+    return hashlib.sha1(f"{title}\n{publish_date}\n{content}".encode('utf-8')).hexdigest()
+
+def find_content_files(root_dir):
     """
-    Traverses the directory, finds content.txt files, and inserts them into the DB.
+    All content.txt files under root_dir as (path relative to BASE_DIR, mtime_ns, size),
+    in a stable (sorted) order so ids are reproducible.
     """
-    cursor = conn.cursor()
-    count = 0
-    
-    print(f"Scanning {source_name} directory: {root_dir}...")
-    
+    files_found = []
     for root, dirs, files in os.walk(root_dir):
+        dirs.sort()
         if 'content.txt' in files:
             file_path = os.path.join(root, 'content.txt')
-            article_data = parse_content_file(file_path)
-            
-            if article_data:
-                cursor.execute('''
-                    INSERT INTO articles (source, title, publish_date, link, content)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (source_name, article_data['title'], article_data['publish_date'], article_data['link'], article_data['content']))
-                count += 1
-                
-                if count % 100 == 0:
-                    print(f"Processed {count} records for {source_name}...")
+            stat = os.stat(file_path)
+            files_found.append((os.path.relpath(file_path, BASE_DIR), stat.st_mtime_ns, stat.st_size))
+    return files_found
+
+# Column order of the rows produced by parse_article_row
+ARTICLE_COLUMNS = ('source', 'title', 'publish_date', 'link', 'content', 'snippet', 'date_day', 'article_key', 'content_hash')
+
+def parse_article_row(source_name, file_path):
+    """Runs in a worker process: file -> ready-to-insert row (or None)."""
+    article_data = parse_content_file(os.path.join(BASE_DIR, file_path))
+    if not article_data:
+        return None
+    title, publish_date, content = article_data['title'], article_data['publish_date'], article_data['content']
+    return (source_name, title, publish_date, article_data['link'], content,
+            content[:SNIPPET_LENGTH], parse_date_day(publish_date),
+            article_key(article_data['link'], title, content), content_hash(title, publish_date, content))
+
+def process_directory(conn, source_name, root_dir, executor):
+    """
+    Parses every content.txt under root_dir on the process pool and bulk-inserts the rows
+    (executemany, one transaction). Returns per-stage timings for the build report.
+    """
+    print(f"Scanning {source_name} directory: {root_dir}...")
+    start = time.perf_counter()
+    files_found = find_content_files(root_dir)
+    paths = [path for path, _, _ in files_found]
+    scan_seconds = time.perf_counter() - start
+
+    insert_seconds = 0.0
+    count = 0
+    batch = []
+    manifest = []
+
+    def flush():
+        nonlocal insert_seconds
+        insert_start = time.perf_counter()
+        # The same article crawled twice (same link) is stored once
+        conn.executemany(f'''
+            INSERT INTO articles ({', '.join(ARTICLE_COLUMNS)})
+            VALUES ({', '.join('?' * len(ARTICLE_COLUMNS))})
+            ON CONFLICT (article_key) DO NOTHING
+        ''', batch)
+        conn.executemany('''
+            INSERT OR REPLACE INTO ingest_files (path, source, mtime_ns, size, article_key) VALUES (?, ?, ?, ?, ?)
+        ''', manifest)
+        insert_seconds += time.perf_counter() - insert_start
+        batch.clear()
+        manifest.clear()
 
+    # map() keeps file order, so rows (and their ids) come out in walk order whatever the worker timing
+    rows = executor.map(parse_article_row, [source_name] * len(paths), paths, chunksize=PARSE_CHUNKSIZE)
+    for (path, mtime_ns, size), row in zip(files_found, rows):
+        if row is None:
+            continue
+        batch.append(row)
+        manifest.append((path, source_name, mtime_ns, size, row[7]))
+        count += 1
+        if len(batch) >= INSERT_BATCH_SIZE:
+            flush()
+            print(f"Processed {count} records for {source_name}...")
+    if batch:
+        flush()
+
+    commit_start = time.perf_counter()
     conn.commit()
+    insert_seconds += time.perf_counter() - commit_start
+    total_seconds = time.perf_counter() - start
     print(f"Finished {source_name}. Total records: {count}")
+    return {
+        "files": len(paths),
+        "records": count,
+        "scan": scan_seconds,
+        "insert": insert_seconds,
+        "total": total_seconds,
+    }
 
-def main():
-    if os.path.exists(DB_NAME):
-        try:
-            os.remove(DB_NAME)
-            print(f"Removed existing database: {DB_NAME}")
-        except PermissionError:
-            print(f"Warning: Could not remove {DB_NAME}. It might be in use. Appending to it (or failing if schema conflict).")
+def upsert_article(conn, row):
+    """Insert or update one parsed row by article key. Returns (change, article id)."""
+    key, digest = row[7], row[8]
+    existing = conn.execute('SELECT id, content_hash FROM articles WHERE article_key = ?', (key,)).fetchone()
+    if existing is None:
+        cursor = conn.execute(f'''
+            INSERT INTO articles ({', '.join(ARTICLE_COLUMNS)}) VALUES ({', '.join('?' * len(ARTICLE_COLUMNS))})
+        ''', row)
+        return 'created', cursor.lastrowid
+    if existing[1] == digest:
+        return 'unchanged', existing[0]
+    conn.execute(f'''
+        UPDATE articles SET {', '.join(f'{column} = ?' for column in ARTICLE_COLUMNS)} WHERE id = ?
+    ''', (*row, existing[0]))
+    return 'updated', existing[0]
 
-    conn = init_db()
-    
-    # Process News Data (Source: news)
-    if os.path.exists(NEWS_DIR):
-        process_directory(conn, 'news', NEWS_DIR)
-    else:
-        print(f"Directory not found: {NEWS_DIR}")
-        
-    # Process Wechat Data (Source: wechat)
-    if os.path.exists(WECHAT_DIR):
-        process_directory(conn, 'wechat', WECHAT_DIR)
+def update_directory(conn, source_name, root_dir, executor, changes):
+    """
+    Incremental counterpart of process_directory: only files that are new or whose mtime/size changed
+    since the last run are parsed; rows are upserted by article key so ids never change, and articles
+    whose files are all gone are deleted. Created/updated/deleted ids are added to `changes`.
+    """
+    print(f"Scanning {source_name} directory: {root_dir}...")
+    start = time.perf_counter()
+    files_found = find_content_files(root_dir)
+    known = {
+        path: (mtime_ns, size, key)
+        for path, mtime_ns, size, key in conn.execute(
+            'SELECT path, mtime_ns, size, article_key FROM ingest_files WHERE source = ?', (source_name,))
+    }
+    changed = [f for f in files_found if known.get(f[0], (None, None))[:2] != (f[1], f[2])]
+    present = {path for path, _, _ in files_found}
+    removed = [path for path in known if path not in present]
+    scan_seconds = time.perf_counter() - start
+    print(f"{len(files_found)} files: {len(changed)} new/changed, {len(removed)} removed")
+
+    insert_start = time.perf_counter()
+    orphan_keys = {known[path][2] for path in removed}
+    rows = executor.map(parse_article_row, [source_name] * len(changed), [f[0] for f in changed], chunksize=PARSE_CHUNKSIZE)
+    count = 0
+    for (path, mtime_ns, size), row in zip(changed, rows):
+        if row is None:
+            continue
+        change, article_id = upsert_article(conn, row)
+        if change != 'unchanged':
+            changes[change].add(article_id)
+        if path in known and known[path][2] != row[7]:
+            orphan_keys.add(known[path][2])  # Link changed: the old article may no longer have a file
+        conn.execute('''
+            INSERT OR REPLACE INTO ingest_files (path, source, mtime_ns, size, article_key) VALUES (?, ?, ?, ?, ?)
+        ''', (path, source_name, mtime_ns, size, row[7]))
+        count += 1
+    conn.executemany('DELETE FROM ingest_files WHERE path = ?', ((path,) for path in removed))
+
+    for key in orphan_keys:
+        if conn.execute('SELECT 1 FROM ingest_files WHERE article_key = ?', (key,)).fetchone():
+            continue
+        row = conn.execute('SELECT id FROM articles WHERE article_key = ?', (key,)).fetchone()
+        if row:
+            conn.execute('DELETE FROM articles WHERE id = ?', (row[0],))
+            changes['deleted'].add(row[0])
+    conn.commit()
+    insert_seconds = time.perf_counter() - insert_start
+    print(f"Finished {source_name}. Parsed {count} files.")
+    return {
+        "files": len(files_found),
+        "records": count,
+        "scan": scan_seconds,
+        "insert": insert_seconds,
+        "total": time.perf_counter() - start,
+    }
+
+def write_changeset(mode, changes):
+    """
+    Writes ingest_changesets/changeset_<time>.json: {"mode", "created", "updated", "deleted"} article ids.
+    A full rebuild lists every id as created (ids were reassigned, downstream indexes must rebuild).
+    """
+    os.makedirs(CHANGESET_DIR, exist_ok=True)
+    changeset = {"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "mode": mode}
+    changeset.update({change: sorted(ids) for change, ids in changes.items()})
+    stamp = time.strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(CHANGESET_DIR, f"changeset_{stamp}.json")
+    counter = 1
+    while os.path.exists(path):  # Two runs in the same second must not overwrite each other's changeset
+        path = os.path.join(CHANGESET_DIR, f"changeset_{stamp}_{counter}.json")
+        counter += 1
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(changeset, f)
+    os.replace(path + ".tmp", path)
+    print(f"Changeset: {len(changeset['created'])} created, {len(changeset['updated'])} updated, "
+          f"{len(changeset['deleted'])} deleted -> {path}")
+
+def print_timing_report(timings):
+    print("\nBuild Timing:")
+    print(f"{'source':<10} {'files':>7} {'records':>8} {'scan(s)':>8} {'insert(s)':>10} {'total(s)':>9} {'rec/s':>8}")
+    for source_name, t in timings.items():
+        rate = t['records'] / t['total'] if t['total'] else 0
+        print(f"{source_name:<10} {t['files']:>7} {t['records']:>8} {t['scan']:>8.2f} {t['insert']:>10.2f} {t['total']:>9.2f} {rate:>8.0f}")
+
+def main(workers=None, incremental=False):
+    if incremental:
+        conn = open_incremental_db()
     else:
-        print(f"Directory not found: {WECHAT_DIR}")
+        if os.path.exists(DB_NAME):
+            try:
+                os.remove(DB_NAME)
+                print(f"Removed existing database: {DB_NAME}")
+            except PermissionError:
+                print(f"Warning: Could not remove {DB_NAME}. It might be in use. Appending to it (or failing if schema conflict).")
+        conn = init_db()
+
+    build_start = time.perf_counter()
+    timings = {}
+    changes = {'created': set(), 'updated': set(), 'deleted': set()}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Source name -> crawl output directory (news / wechat / business knowledge)
+        for source_name, root_dir in (('news', NEWS_DIR), ('wechat', WECHAT_DIR), ('business', BUSINESS_DIR)):
+            if not os.path.exists(root_dir):
+                print(f"Directory not found: {root_dir}")
+            elif incremental:
+                timings[source_name] = update_directory(conn, source_name, root_dir, executor, changes)
+            else:
+                timings[source_name] = process_directory(conn, source_name, root_dir, executor)
 
-    # Process Business Knowledge Data (Source: business)
-    if os.path.exists(BUSINESS_DIR):
-        process_directory(conn, 'business', BUSINESS_DIR)
+    index_start = time.perf_counter()
+    if incremental:
+        # Triggers kept FTS in sync; FTS5 automerge and PRAGMA optimize keep a small daily delta cheap
+        create_list_indexes(conn, analyze=False)
+        conn.execute("PRAGMA optimize")
     else:
-        print(f"Directory not found: {BUSINESS_DIR}")
+        # Index the loaded rows in one pass, then let triggers maintain it from here on
+        conn.execute("INSERT INTO articles_fts(articles_fts) VALUES('rebuild')")
+        fill_ngram_index(conn.cursor())
+        create_fts_triggers(conn.cursor())
+        changes['created'] = {row[0] for row in conn.execute("SELECT id FROM articles")}
+        create_list_indexes(conn)
+
+        # Merge FTS segments into one b-tree for faster queries
+        conn.execute("INSERT INTO articles_fts(articles_fts) VALUES('optimize')")
+        conn.execute("INSERT INTO articles_ngram(articles_ngram) VALUES('optimize')")
+    conn.commit()
+    index_seconds = time.perf_counter() - index_start
+
+    print_timing_report(timings)
+    print(f"Indexes (FTS + list): {index_seconds:.2f}s | Total build: {time.perf_counter() - build_start:.2f}s")
+    write_changeset('incremental' if incremental else 'full', changes)
 
     # Verify counts
     cursor = conn.cursor()
@@ -135,7 +544,12 @@ def main():
         print(f"Source: {row[0]}, Count: {row[1]}")
         
     conn.close()
-    print(f"\nDatabase {DB_NAME} created successfully.")
+    print(f"\nDatabase {DB_NAME} {'updated' if incremental else 'created'} successfully.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build fudan_knowledge_base.db from the crawled content.txt files")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Upsert into the existing DB: only new/changed files are parsed and article ids are kept")
+    args = parser.parse_args()
+    main(args.workers, args.incremental)
\ No newline at end of file
@@ -0,0 +1,421 @@
+import os
+import re
+import json
+import asyncio
+import argparse
+import threading
+import aiohttp
+
+try:
+    from charset_normalizer import from_bytes  # requests 自带的依赖，一般已安装
+except ImportError:
+    from_bytes = None
+
+# ==============================================================
+# 共享异步抓取引擎 (crawler / wechatcrawler / mediacrawler / business_knowledge_crawler 共用)
+# - 一个 aiohttp 会话 + 按主机分组的连接池：keep-alive 复用，不再每个请求重新握手 TCP/TLS
+# - 并发数可配置 (--concurrency / --per-host)
+# - 列表页 -> 详情页 -> 图片 三个阶段各自独立的队列和 worker 数，
+#   慢的图片服务器不会拖住正文抓取
+# - 增量模式 (--incremental)：列表页带 ETag / Last-Modified 条件请求，
+#   连续 N 页 (--stop-after) 都没有新文章就提前结束，日常更新只需几秒
+# - 各爬虫只需提供「列表页解析」和「详情页解析」两个函数
+# 依赖: pip install aiohttp beautifulsoup4
+# ==============================================================
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+}
+
+DEFAULT_CONCURRENCY = 16   # 同时进行的请求总数
+DEFAULT_PER_HOST = 8       # 单个主机的连接上限 (学校官网 / 微信图片服务器分别计算)
+DEFAULT_TIMEOUT = 15
+MAX_RETRIES = 2            # 连接错误 / 超时 / 5xx 的重试次数
+
+# 各阶段 worker 数 (同时在处理的列表页 / 详情页 / 图片)
+DEFAULT_LIST_WORKERS = 4
+DEFAULT_DETAIL_WORKERS = 16
+DEFAULT_IMAGE_WORKERS = 16
+QUEUE_SIZE = 256           # 阶段间队列上限：下游跟不上时上游自动等待，内存不会无限增长
+
+DEFAULT_STOP_AFTER = 2     # 增量模式：连续多少页没有新文章就停止
+VALIDATORS_FILE = "http_validators.json"  # 列表页的 ETag / Last-Modified 记录 (保存在 save_root 下)
+
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+
+print_lock = threading.Lock()
+
+def safe_print(msg):
+    with print_lock:
+        print(msg)
+
+# --- 工具函数 ---
+
+def clean_filename(text):
+    """清理文件名"""
+    return re.sub(r'[\\/*?:"<>|\n\t]', "", text).strip()
+
+def determine_ext(url):
+    """适配微信图片后缀"""
+    if "wx_fmt=png" in url: return ".png"
+    if "wx_fmt=gif" in url: return ".gif"
+    if "wx_fmt=jpeg" in url or "wx_fmt=jpg" in url: return ".jpg"
+    ext = os.path.splitext(url)[1]
+    if ext and len(ext) <= 5: return ext
+    return ".jpg"
+
+def article_paths(save_root, title, date):
+    """文章保存路径: <save_root>/<YYYY-MM>/<日期>_<标题前50字>/content.txt"""
+    month_str = date[:7]
+    safe_title = clean_filename(title)[:50]
+    target_dir = os.path.join(save_root, month_str, f"{date}_{safe_title}")
+    return target_dir, os.path.join(target_dir, "content.txt"), safe_title
+
+def write_content_file(content_file, title, date, url, mode_line, text):
+    with open(content_file, 'w', encoding='utf-8') as f:
+        f.write(f"标题: {title}\n")
+        f.write(f"日期: {date}\n")
+        f.write(f"链接: {url}\n")
+        f.write(f"{mode_line}\n")
+        f.write("-" * 40 + "\n\n")
+        f.write(text)
+
+def guess_encoding(raw):
+    """按内容推测编码 (相当于 requests 的 apparent_encoding)，无法判断时用 utf-8"""
+    if from_bytes is not None:
+        best = from_bytes(raw).best()
+        if best is not None:
+            return best.encoding
+    return 'utf-8'
+
+def detect_encoding(raw, header_charset=None):
+    """
+    编码识别：响应头 charset -> 页面 <meta charset> -> 按内容推测。
+    很多媒体网站是 GBK 且响应头不带 charset，直接按 utf-8 解码会变成乱码。
+    """
+    charset = header_charset
+    if not charset:
+        match = META_CHARSET_PATTERN.search(raw[:4096])
+        charset = match.group(1).decode('ascii') if match else None
+    if not charset:
+        return guess_encoding(raw)
+    # gb2312 / gbk 页面里常混有扩展字符，用兼容它们的 gb18030 解码
+    return 'gb18030' if charset.lower() in ('gb2312', 'gbk') else charset
+
+def crawl_args(description):
+    """所有爬虫共用的命令行参数"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="同时进行的请求总数")
+    parser.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST, help="单个主机的连接上限")
+    parser.add_argument("--list-workers", type=int, default=DEFAULT_LIST_WORKERS, help="列表页阶段 worker 数")
+    parser.add_argument("--detail-workers", type=int, default=DEFAULT_DETAIL_WORKERS, help="详情页阶段 worker 数")
+    parser.add_argument("--image-workers", type=int, default=DEFAULT_IMAGE_WORKERS, help="图片下载阶段 worker 数")
+    parser.add_argument("--incremental", action="store_true", help="增量模式：条件请求 + 连续无新文章时提前结束")
+    parser.add_argument("--stop-after", type=int, default=DEFAULT_STOP_AFTER, help="增量模式：连续多少页没有新文章就停止")
+    return parser
+
+# --- 抓取引擎 ---
+
+class FetchEngine:
+    """
+    用法:
+        async with FetchEngine(concurrency=16) as engine:
+            status, html, final_url = await engine.get_text(url)
+    """
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST, timeout=DEFAULT_TIMEOUT, headers=HEADERS):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.headers = headers
+        self.session = None
+        self.requests = 0
+        self.bytes = 0
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,         # 连接池总上限 = 并发上限
+            limit_per_host=self.per_host,
+            ttl_dns_cache=300,
+            keepalive_timeout=30,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def _request(self, url, timeout, read, headers=None):
+        last_error = None
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                kwargs = {"timeout": aiohttp.ClientTimeout(total=timeout)} if timeout else {}
+                async with self.session.get(url, headers=headers, **kwargs) as resp:
+                    if resp.status >= 500 and attempt < MAX_RETRIES:
+                        await asyncio.sleep(2 ** attempt)
+                        continue
+                    body = await read(resp)
+                    self.requests += 1
+                    return resp, body
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = e
+                if attempt < MAX_RETRIES:
+                    await asyncio.sleep(2 ** attempt)
+        raise last_error
+
+    def _text_reader(self, encoding):
+        async def read(resp):
+            raw = await resp.read()
+            self.bytes += len(raw)
+            if resp.status == 304:
+                return None
+            charset = encoding or detect_encoding(raw, resp.charset)
+            try:
+                return raw.decode(charset, errors='replace')
+            except LookupError:  # 页面声明了 Python 不认识的编码名
+                return raw.decode(guess_encoding(raw), errors='replace')
+        return read
+
+    async def get_text(self, url, encoding=None, timeout=None):
+        """返回 (状态码, 文本, 最终URL)。encoding=None 时按响应头/内容自动识别编码"""
+        resp, text = await self._request(url, timeout, self._text_reader(encoding))
+        return resp.status, text, str(resp.url)
+
+    async def get_page(self, url, validators=None, encoding=None):
+        """
+        条件请求: validators = {'etag', 'last_modified'} (上次响应的缓存校验头)。
+        返回 (状态码, 文本, 本次响应的 validators)；服务器返回 304 时文本为 None。
+        """
+        headers = {}
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        resp, text = await self._request(url, None, self._text_reader(encoding), headers or None)
+        if resp.status == 304:
+            return resp.status, None, validators
+        fresh = {'etag': resp.headers.get('ETag'), 'last_modified': resp.headers.get('Last-Modified')}
+        return resp.status, text, {k: v for k, v in fresh.items() if v}
+
+    async def get_bytes(self, url, timeout=None):
+        """返回 (状态码, 字节内容)"""
+        async def read(resp):
+            raw = await resp.read()
+            self.bytes += len(raw)
+            return raw
+        resp, raw = await self._request(url, timeout, read)
+        return resp.status, raw
+
+# --- 列表页缓存校验 ---
+
+class ListPageValidators:
+    """
+    列表页的 ETag / Last-Modified 记录 (<save_root>/http_validators.json)。
+    只有当一页上的文章在本次运行结束时全部保存成功，才记录这一页的校验头，
+    所以下次请求得到 304 就说明这一页没有新文章。
+    """
+    def __init__(self, save_root):
+        self.path = os.path.join(save_root, VALIDATORS_FILE)
+        self.saved = {}
+        self.pending = {}  # url -> (validators, 这一页所有文章的 content.txt 路径)
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.saved = json.load(f)
+            except (OSError, ValueError):
+                safe_print(f"[警告] {self.path} 无法读取，忽略缓存校验记录")
+
+    def get(self, url):
+        return self.saved.get(url)
+
+    def observe(self, url, validators, content_files):
+        self.pending[url] = (validators, content_files)
+
+    def save(self):
+        if not self.pending:
+            return
+        for url, (validators, content_files) in self.pending.items():
+            if validators and all(os.path.exists(f) for f in content_files):
+                self.saved[url] = validators
+            else:
+                self.saved.pop(url, None)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.saved, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        self.pending = {}
+
+# --- 通用爬取流程：列表页 -> 详情页 -> 图片 三段流水线 ---
+
+async def save_image(engine, img_url, save_path, timeout, stats):
+    """下载图片 (已存在则跳过)"""
+    try:
+        if os.path.exists(save_path):
+            return
+        status, content = await engine.get_bytes(img_url, timeout=timeout)
+        if status == 200:
+            with open(save_path, 'wb') as f:
+                f.write(content)
+            stats['images'] += 1
+        else:
+            safe_print(f"   [图片失败] {status} - {img_url}")
+    except Exception as e:
+        safe_print(f"   [图片失败] {e} - {img_url}")
+
+async def crawl_detail(engine, site, item, image_queue, stats):
+    """
+    抓取并保存一篇文章的正文，图片交给图片阶段的队列。site 为爬虫模块提供的配置 (见 run_site)，
+    item = {'title', 'date', 'url'}。content.txt 已存在则跳过 (断点续爬)。
+    """
+    title, date, url = item['title'], item['date'], item['url']
+    target_dir, content_file, safe_title = article_paths(site['save_root'], title, date)
+    try:
+        if os.path.exists(content_file):
+            stats['skipped'] += 1
+            safe_print(f"   [跳过] (已存在) {safe_title}...")
+            return
+
+        status, html, final_url = await engine.get_text(url, encoding=site.get('encoding'))
+        # BeautifulSoup 解析放到线程里，不阻塞其他请求的网络 IO
+        article = await asyncio.to_thread(site['parse_detail'], html, final_url, item)
+        if not article:
+            safe_print(f"   [警告] {safe_title} -> 无法识别页面结构 (URL: {url})")
+            with open(os.path.join(site['save_root'], "failed_urls.txt"), "a") as f:
+                f.write(f"{url}\n")
+            return
+
+        os.makedirs(target_dir, exist_ok=True)
+        write_content_file(content_file, title, date, url, article['mode_line'], article['text'])
+        stats['articles'] += 1
+
+        for index, img_url in article['images']:
+            save_path = os.path.join(target_dir, f"image_{index}{determine_ext(img_url)}")
+            await image_queue.put((img_url, save_path))
+
+        safe_print(f" [成功] {date} | {safe_title}... [{article['mode']} | 图:{len(article['images'])}]")
+    except Exception as e:
+        safe_print(f" [错误] {title} 解析失败: {e}")
+
+async def crawl_list_page(engine, site, page_num, detail_queue, stats, validators, conditional):
+    """
+    处理单个列表页：本地还没有的文章条目放入详情页队列。
+    返回这一页是否「全部已知」(没有新文章，或 304 未变化)，供增量模式判断何时停止。
+    """
+    list_url = site['list_url_template'].format(page_num)
+    safe_print(f"--> 读取列表: 第 {page_num} 页")
+    try:
+        status, html, page_validators = await engine.get_page(
+            list_url, validators.get(list_url) if conditional else None, encoding=site.get('encoding'))
+        if status == 304:
+            stats['unchanged'] += 1
+            safe_print(f"   [未变化] 第 {page_num} 页 (304)")
+            return True
+
+        items = await asyncio.to_thread(site['parse_list'], html)
+        stats['list_pages'] += 1
+        content_files = [article_paths(site['save_root'], item['title'], item['date'])[1] for item in items]
+        validators.observe(list_url, page_validators, content_files)
+
+        new_items = [item for item, path in zip(items, content_files) if not os.path.exists(path)]
+        stats['skipped'] += len(items) - len(new_items)
+        for item in new_items:
+            await detail_queue.put(item)
+        return not new_items
+    except Exception as e:
+        safe_print(f"列表页 {page_num} 异常: {e}")
+        return False
+
+async def _stage_worker(queue, handle):
+    """从队列取任务执行，直到被取消"""
+    while True:
+        job = await queue.get()
+        try:
+            await handle(job)
+        finally:
+            queue.task_done()
+
+async def _feed_incremental(list_queue, pages, page_known, args):
+    """
+    增量模式下按页码顺序每次放入 list_workers 页，等这一批列表页处理完再决定是否继续：
+    按页码顺序连续 stop_after 页全部已知就停止 (详情页 / 图片阶段不受影响，继续在后台跑)。
+    """
+    pages = list(pages)
+    streak = 0
+    batch_size = max(1, args.list_workers)
+    for start in range(0, len(pages), batch_size):
+        batch = pages[start:start + batch_size]
+        for page in batch:
+            list_queue.put_nowait(page)
+        await list_queue.join()
+        for page in batch:
+            streak = streak + 1 if page_known.get(page) else 0
+            if streak >= args.stop_after:
+                safe_print(f"连续 {streak} 页没有新文章，在第 {page} 页提前结束")
+                return
+
+async def _run_site(site, pages, items, args):
+    stats = {'list_pages': 0, 'unchanged': 0, 'articles': 0, 'skipped': 0, 'images': 0}
+    validators = ListPageValidators(site['save_root'])
+    page_known = {}
+    list_queue = asyncio.Queue()
+    detail_queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    image_queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    async with FetchEngine(concurrency=args.concurrency, per_host=args.per_host) as engine:
+        async def list_job(page):
+            page_known[page] = await crawl_list_page(
+                engine, site, page, detail_queue, stats, validators, conditional=args.incremental)
+
+        stages = (
+            (list_queue, args.list_workers, list_job),
+            (detail_queue, args.detail_workers, lambda item: crawl_detail(engine, site, item, image_queue, stats)),
+            (image_queue, args.image_workers,
+             lambda job: save_image(engine, job[0], job[1], site.get('image_timeout', DEFAULT_TIMEOUT), stats)),
+        )
+        workers = [
+            asyncio.create_task(_stage_worker(queue, handle))
+            for queue, count, handle in stages
+            for _ in range(count)
+        ]
+
+        if pages is not None and args.incremental:
+            await _feed_incremental(list_queue, pages, page_known, args)
+        elif pages is not None:
+            for page in pages:
+                list_queue.put_nowait(page)
+        else:
+            # 链接文件模式：没有列表页，条目直接进入详情页阶段
+            for item in items:
+                await detail_queue.put(item)
+
+        # 上游全部完成后，下游的队列才不会再有新任务
+        await list_queue.join()
+        await detail_queue.join()
+        await image_queue.join()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        # 所有文章和图片都处理完后再记录校验头，保证 304 的页面确实没有遗漏
+        validators.save()
+        return stats, engine.requests, engine.bytes
+
+def run_site(site, args, pages=None, items=None):
+    """
+    爬虫入口。site 是一个 dict:
+        save_root          保存目录
+        parse_detail       (html, final_url, item) -> {'mode', 'mode_line', 'text', 'images': [(序号, 绝对URL)]} 或 None
+        parse_list         (html) -> [{'title', 'date', 'url'}]          (列表页模式需要)
+        list_url_template  列表页地址模板，如 "...?p={}"                 (列表页模式需要)
+        encoding           页面编码，None 为自动识别 (响应头 / <meta charset> / 按内容推测)
+        image_timeout      图片下载超时
+    args: crawl_args() 解析出的参数 (并发 / 各阶段 worker 数 / 增量模式)
+    pages: 列表页页码 (列表页模式)；items: 直接给出文章条目 (链接文件模式)
+    """
+    os.makedirs(site['save_root'], exist_ok=True)
+    stats, requests_made, bytes_read = asyncio.run(_run_site(site, pages, items, args))
+    safe_print(f"列表页: {stats['list_pages']} (未变化 {stats['unchanged']}) | 新文章: {stats['articles']} | 跳过: {stats['skipped']} | "
+               f"图片: {stats['images']} | 请求数: {requests_made} | 下载: {bytes_read / 1024 / 1024:.1f} MB")
@@ -8,6 +8,8 @@ from langchain_community.vectorstores import Chroma
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
+from backend.embedding_cache import EmbeddingCache, CachedEmbeddings
+
 import os
 
 # Configuration
@@ -20,6 +22,11 @@ os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 SQLITE_DB_PATH = os.path.join(BASE_DIR, 'fudan_knowledge_base.db')
 CHROMA_DB_DIR = os.path.join(BASE_DIR, 'chroma_db')
+# Shared with create_vector_db_faiss.py: rebuilding Chroma re-uses every embedding already paid for
+EMBEDDING_CACHE_DIR = os.path.join(BASE_DIR, 'embedding_cache')
+
+EMBEDDING_MODEL = "models/gemini-embedding-exp-03-07"
+EMBEDDING_TASK_TYPE = "retrieval_document"
 
 # Configuration
 BATCH_SIZE = 100  # Number of chunks to process per API call/db insertion
@@ -66,10 +73,12 @@ def create_vector_store(chunks):
     """Generates embeddings and stores them in ChromaDB with batch processing."""
     
     # 1. Setup Embedding Model
-    print("Initializing Embedding Model (gemini-embedding-exp-03-07) with task_type='retrieval_document'...")
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/gemini-embedding-exp-03-07",
-        task_type="retrieval_document"
+    print(f"Initializing Embedding Model ({EMBEDDING_MODEL}) with task_type='{EMBEDDING_TASK_TYPE}' and cache at {EMBEDDING_CACHE_DIR}...")
+    embeddings = CachedEmbeddings(
+        GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL, task_type=EMBEDDING_TASK_TYPE),
+        EmbeddingCache(EMBEDDING_CACHE_DIR),
+        EMBEDDING_MODEL,
+        EMBEDDING_TASK_TYPE,
     )
     
     # 2. Clean existing DB
@@ -108,6 +117,7 @@ def create_vector_store(chunks):
             # Continue to next batch or break? Let's try to continue.
             continue
             
+    print(f"💾 Embedding cache: {embeddings.hits} hits, {embeddings.misses} sent to the API")
     print(f"✅ Vector store created and persisted at {CHROMA_DB_DIR}")
     return vectorstore
 
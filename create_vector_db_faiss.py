@@ -1,13 +1,27 @@
 import sqlite3
 import os
 import time
+import json
+import hashlib
+import shutil
+import uuid
+import argparse
+from collections import defaultdict
+import numpy as np
+import faiss
 from tqdm import tqdm
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_community.vectorstores import FAISS
-from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
+from backend.vector_store import (write_chunk_store, has_chunk_store, build_ann_index, ann_index_file, ANN_INDEX_TYPES,
+                                  INDEX_FILE_NAME, CHUNKS_DB_NAME, BUILDS_DIR_NAME, CURRENT_BUILD_FILE,
+                                  published_build, write_build_info, stamp_chunk_store)
+from backend.embedding_cache import EmbeddingCache, CachedEmbeddings
+from backend.embedding_pipeline import TokenBucket, RateLimitedEmbeddings, ordered_map, prefetch
+from backend.index_checkpoint import IndexCheckpoint, CHECKPOINT_DIR_NAME
+
 import os
 
 # Configuration
@@ -20,121 +34,520 @@ os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 SQLITE_DB_PATH = os.path.join(BASE_DIR, 'fudan_knowledge_base.db')
 FAISS_DB_DIR = os.path.join(BASE_DIR, 'faiss_index')
+# Every run writes a full serving tree here, then publish_build() moves it to faiss_index/builds/<build id>/
+STAGING_DIR_NAME = '_staging'
+STAGING_DIR = os.path.join(FAISS_DB_DIR, STAGING_DIR_NAME)
+STAGING_INFO_NAME = 'staging.json'
+# Inside a serving tree. Sharded layout: shards/<shard_name>/ + shards/manifest.json
+SHARDS_DIR_NAME = 'shards'
+SHARD_MANIFEST_NAME = 'manifest.json'
+# Article-level centroid index (coarse stage of two-stage retrieval)
+ARTICLE_INDEX_DIR_NAME = 'articles'
+# Embeddings already paid for, shared with create_vector_db.py (survives index/chunking/shard changes)
+EMBEDDING_CACHE_DIR = os.path.join(BASE_DIR, 'embedding_cache')
+
+EMBEDDING_MODEL = "models/gemini-embedding-exp-03-07"
+EMBEDDING_TASK_TYPE = "retrieval_document"
 
 # Configuration
 BATCH_SIZE = 50   # Process 50 chunks at a time
-SAVE_EVERY_N_BATCHES = 5 # Save to disk every 5 batches (approx every 250 chunks)
+SAVE_EVERY_N_BATCHES = 5 # Commit a checkpoint part every 5 batches (approx every 250 chunks)
+EMBED_CONCURRENCY = 4  # Embedding requests in flight
+EMBED_REQUESTS_PER_MINUTE = 150  # Token-bucket ceiling; set to the project's embedding quota
+FETCH_SIZE = 200  # Articles per cursor.fetchmany() round trip
+PREFETCH_BATCHES = 4  # Split batches buffered ahead of the embedding workers
+REFRESH_BATCH_SIZE = 1000  # Unchanged chunks per metadata-refresh batch
 
-def get_articles_from_db():
-    print("Reading data from SQLite...")
+def iter_articles(source=False):
+    """
+    Streams articles as Documents, FETCH_SIZE rows per round trip (never the whole table in memory).
+    All articles by default; pass a source to read one shard (None = articles without a source).
+    """
     conn = sqlite3.connect(SQLITE_DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, title, publish_date, link, content, source FROM articles")
-    rows = cursor.fetchall()
-    conn.close()
-    
-    documents = []
-    print(f"Converting {len(rows)} database rows to documents...")
-    for row in tqdm(rows, desc="Loading Articles", unit="article"):
-        metadata = {
-            "article_id": row[0],
-            "title": row[1] if row[1] else "Untitled",
-            "publish_date": row[2] if row[2] else "Unknown",
-            "link": row[3] if row[3] else "",
-            "source": row[5]
-        }
-        content = row[4]
-        if content:
-            documents.append(Document(page_content=content, metadata=metadata))
-    return documents
+    try:
+        cursor = conn.cursor()
+        sql = "SELECT id, title, publish_date, link, content, source FROM articles"
+        params = ()
+        if source is not False:
+            sql += " WHERE source IS ?"  # IS also matches NULL sources (the "unknown" shard)
+            params = (source,)
+        cursor.execute(sql + " ORDER BY id", params)
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                metadata = {
+                    "article_id": row[0],
+                    "title": row[1] if row[1] else "Untitled",
+                    "publish_date": row[2] if row[2] else "Unknown",
+                    "link": row[3] if row[3] else "",
+                    "source": row[5]
+                }
+                content = row[4]
+                if content:
+                    yield Document(page_content=content, metadata=metadata)
+    finally:
+        conn.close()
 
-def split_documents(documents):
-    print("Splitting documents into chunks...")
+def iter_chunks(documents):
+    """Splits documents one at a time, so the first chunks reach the embedder immediately."""
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=800,
         chunk_overlap=100,
         length_function=len,
     )
-    chunks = text_splitter.split_documents(documents)
-    print(f"Total chunks available: {len(chunks)}")
-    return chunks
-
-def create_vector_store(chunks):
-    print("Initializing Embedding Model (gemini-embedding-exp-03-07)...")
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/gemini-embedding-exp-03-07",
-        task_type="retrieval_document"
-    )
-    
-    vectorstore = None
-    processed_count = 0
+    for document in documents:
+        yield from text_splitter.split_documents([document])
+
+def iter_chunk_ids(chunks):
+    """
+    Yields (stable id, chunk): "<article_id>:<content hash>", plus ":<n>" for repeated identical text
+    within one article. The same chunk gets the same id on every run, whatever the article order.
+    Chunks arrive article by article, so the repeat counter only ever holds the current article's chunks.
+    """
+    seen = defaultdict(int)
+    article_id = None
+    for chunk in chunks:
+        if chunk.metadata.get("article_id") != article_id:
+            article_id = chunk.metadata.get("article_id")
+            seen.clear()
+        digest = hashlib.sha1(chunk.page_content.encode("utf-8")).hexdigest()[:16]
+        base = f"{chunk.metadata.get('article_id')}:{digest}"
+        yield (base if seen[base] == 0 else f"{base}:{seen[base]}"), chunk
+        seen[base] += 1
+
+def chunk_ids(chunks):
+    return [chunk_id for chunk_id, _ in iter_chunk_ids(chunks)]
+
+def read_chunk_ids(index_dir):
+    """
+    Stable chunk ids by FAISS position from chunks.db, streamed. Stores exported before chunks.db
+    had a chunk_id column get them recomputed from the stored text (no re-embedding).
+    """
+    conn = sqlite3.connect(os.path.join(index_dir, CHUNKS_DB_NAME))
+    try:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(chunks)")}
+        if "chunk_id" in columns:
+            return [row[0] for row in conn.execute("SELECT chunk_id FROM chunks ORDER BY vector_id")]
+        docs = (Document(page_content=text, metadata=json.loads(metadata))
+                for text, metadata in conn.execute("SELECT page_content, metadata FROM chunks ORDER BY vector_id"))
+        return chunk_ids(docs)
+    finally:
+        conn.close()
+
+def load_built_index(index_dir, embeddings):
+    """
+    (exact FAISS index, chunk id of every position) of the last merged build, or (None, []).
+    Only vectors and ids are loaded; indexes that only have the legacy pickle are read once to get them.
+    """
+    if has_chunk_store(index_dir):
+        return faiss.read_index(os.path.join(index_dir, INDEX_FILE_NAME)), read_chunk_ids(index_dir)
+    if os.path.exists(os.path.join(index_dir, INDEX_FILE_NAME)):
+        legacy = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+        docs = (legacy.docstore.search(legacy.index_to_docstore_id[i]) for i in range(legacy.index.ntotal))
+        return legacy.index, chunk_ids(docs)
+    return None, []
+
+def get_cached_embeddings(api):
+    """Gemini document embeddings behind the on-disk cache: only texts never embedded before hit the API."""
+    return CachedEmbeddings(api, EmbeddingCache(EMBEDDING_CACHE_DIR), EMBEDDING_MODEL, EMBEDDING_TASK_TYPE)
+
+def create_vector_store(chunks, index_dir=STAGING_DIR, base_dir=None, concurrency=EMBED_CONCURRENCY,
+                        requests_per_minute=EMBED_REQUESTS_PER_MINUTE):
+    """
+    Incremental, streaming build into `index_dir`: `chunks` is consumed lazily. Only chunks whose stable id
+    is not in the previous index yet are embedded, and vectors of chunks that no longer exist (deleted/edited
+    articles, changed chunking) are removed at the end. Returns the number of vectors in the index.
+    The previous index is `index_dir` itself when a resumed run already merged there, else `base_dir`
+    (the same index in the published build).
 
-    # 1. Try to load existing index to RESUME
-    if os.path.exists(FAISS_DB_DIR) and os.path.exists(os.path.join(FAISS_DB_DIR, "index.faiss")):
+    Stages, each bounded so memory does not grow with the corpus:
+      read + split (own thread) -> PREFETCH_BATCHES queue -> embedding workers (2 x concurrency in flight)
+      -> ordered insertion on this thread
+    Only the vectors and chunk ids are held in RAM; chunk text and metadata go to the checkpoint's
+    rows.db as each batch arrives and from there into chunks.db at the final merge.
+    """
+    print(f"Initializing Embedding Model ({EMBEDDING_MODEL}) with cache at {EMBEDDING_CACHE_DIR}...")
+    limiter = TokenBucket(requests_per_minute, capacity=concurrency)
+    api = RateLimitedEmbeddings(GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL, task_type=EMBEDDING_TASK_TYPE), limiter)
+    embeddings = get_cached_embeddings(api)
+
+    index, ids = None, []
+    checkpoint = IndexCheckpoint(index_dir)
+    checkpoint.recover()
+
+    # 1. Load the last merged index, then replay checkpoint parts a previous (crashed) run committed
+    previous_dir = index_dir if os.path.exists(os.path.join(index_dir, INDEX_FILE_NAME)) else base_dir
+    if previous_dir and os.path.exists(os.path.join(previous_dir, INDEX_FILE_NAME)):
         try:
-            print(f"🔄 Found existing index at {FAISS_DB_DIR}. Attempting to resume...")
-            vectorstore = FAISS.load_local(FAISS_DB_DIR, embeddings, allow_dangerous_deserialization=True)
-            processed_count = vectorstore.index.ntotal
-            print(f"✅ Resuming from chunk {processed_count}/{len(chunks)}")
+            print(f"🔄 Found existing index at {previous_dir}. Diffing by chunk id...")
+            index, ids = load_built_index(previous_dir, embeddings)
         except Exception as e:
             print(f"⚠️ Could not load existing index ({e}). Starting from scratch.")
+            index, ids = None, []
     else:
         print("🆕 Starting new vector index.")
+    for part_ids, vectors in checkpoint.parts():
+        index = _add_vectors(index, vectors)
+        ids += part_ids
+    if checkpoint.manifest["parts"]:
+        print(f"♻️ Replayed {len(checkpoint.manifest['parts'])} checkpoint parts")
+    existing_ids = set(ids)
+    checkpoint.reset_rows()
 
-    # 2. Slice chunks to process only new ones
-    if processed_count >= len(chunks):
-        print("🎉 All chunks are already processed!")
-        return
-
-    remaining_chunks = chunks[processed_count:]
-    total_batches = (len(remaining_chunks) + BATCH_SIZE - 1) // BATCH_SIZE
-    
-    print(f"Processing {len(remaining_chunks)} remaining chunks in {total_batches} batches...")
-
-    batch_idx = 0
-    for i in tqdm(range(0, len(remaining_chunks), BATCH_SIZE), desc="Vectorizing", unit="batch"):
-        batch = remaining_chunks[i : i + BATCH_SIZE]
-        
-        # Retry logic for API calls
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                if vectorstore is None:
-                    vectorstore = FAISS.from_documents(batch, embeddings, distance_strategy=DistanceStrategy.COSINE)
-                else:
-                    vectorstore.add_documents(batch)
-                break # Success
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    print(f"\n❌ Error on batch {batch_idx}: {e}")
-                    raise e
-                time.sleep(2) # Wait before retry
-
-        batch_idx += 1
-
-        # Periodic Save (Checkpointing)
-        if batch_idx % SAVE_EVERY_N_BATCHES == 0:
-            _save_index(vectorstore)
-            
-    # Final Save
-    _save_index(vectorstore)
-    print("🎉 All operations completed successfully!")
+    seen_ids = set()  # Only ids are kept for the whole run (to find stale vectors), never chunk text
 
-def _save_index(vectorstore):
-    """Helper to save safely"""
-    if not os.path.exists(FAISS_DB_DIR):
-        os.makedirs(FAISS_DB_DIR, exist_ok=True)
-    
+    def batches():
+        """Stage 1: new chunks grouped into embedding batches, unchanged ones for a metadata refresh."""
+        new, kept = [], []
+        for chunk_id, chunk in iter_chunk_ids(chunks):
+            seen_ids.add(chunk_id)
+            if chunk_id in existing_ids:
+                kept.append((chunk_id, chunk))
+            else:
+                new.append((chunk_id, chunk))
+            if len(new) >= BATCH_SIZE or len(kept) >= REFRESH_BATCH_SIZE:
+                yield new, kept
+                new, kept = [], []
+        if new or kept:
+            yield new, kept
+
+    def embed_batch(batch):
+        """Stage 2: runs on the embedding workers."""
+        new, _ = batch
+        return embeddings.embed_documents([chunk.page_content for _, chunk in new]) if new else []
+
+    print(f"Streaming chunks ({concurrency} workers, <= {requests_per_minute} requests/min)...")
+    progress = tqdm(desc="Vectorizing", unit="chunk")
+    added = batch_idx = 0
     try:
-        vectorstore.save_local(FAISS_DB_DIR)
-        # print(f"💾 Checkpoint saved.") # Optional: reduce spam
+        # Stage 3: batches arrive in read order and are inserted in that order
+        for (new, kept), vectors in ordered_map(embed_batch, prefetch(batches(), PREFETCH_BATCHES), concurrency):
+            # Text + current metadata (title, date, ... may change without the text changing) of every chunk go to disk
+            batch = kept + new
+            checkpoint.write_rows([chunk_id for chunk_id, _ in batch], [chunk.page_content for _, chunk in batch],
+                                  [chunk.metadata for _, chunk in batch])
+            if new:
+                batch_ids = [chunk_id for chunk_id, _ in new]
+                index = _add_vectors(index, vectors)
+                ids += batch_ids
+                checkpoint.add(batch_ids, vectors)
+                added += len(new)
+                batch_idx += 1
+
+                # Checkpoint: append only the batches since the last commit - a crash resumes from here
+                if batch_idx % SAVE_EVERY_N_BATCHES == 0:
+                    checkpoint.commit()
+
+            progress.update(len(new) + len(kept))
+            progress.set_postfix(new=added, rpm=f"{limiter.requests_per_minute:.0f}", api=embeddings.misses,
+                                 cached=embeddings.hits, retries=api.retries, throttled=api.throttled)
     except Exception as e:
-        print(f"\n❌ Failed to save index: {e}")
+        print(f"\n❌ Error on batch {batch_idx}: {e}")
+        checkpoint.commit()  # Keep the finished batches for the next run
+        raise
+    finally:
+        progress.close()
+
+    if index is None:
+        print("No chunks to index.")
+        return 0
+
+    stale_positions = [pos for pos, chunk_id in enumerate(ids) if chunk_id not in seen_ids]
+    if stale_positions:
+        # IndexFlat compacts in order, so the surviving ids keep lining up with positions
+        index.remove_ids(faiss.IDSelectorBatch(np.asarray(stale_positions, dtype=np.int64)))
+        ids = [chunk_id for chunk_id in ids if chunk_id in seen_ids]
+    print(f"📊 {len(seen_ids) - added} unchanged | {added} new/changed | {len(stale_positions)} stale removed")
+
+    # Final merge: the only full write of the serving files (index.faiss + chunks.db), swapped in by rename
+    os.makedirs(index_dir, exist_ok=True)
+    checkpoint.merge(index, ids)
+    print(f"💾 Embedding cache: {embeddings.hits} hits, {embeddings.misses} sent to the API")
+    print("🎉 All operations completed successfully!")
+    return index.ntotal
+
+def _add_vectors(index, vectors):
+    """Adds already-embedded chunks, creating the exact L2 index on the first batch."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if index is None:
+        index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    return index
+
+def shard_key(metadata, by_year=False):
+    """Shard name for a chunk: its source, optionally suffixed with the publish year."""
+    source = metadata.get("source") or "unknown"
+    if not by_year:
+        return source
+    year = str(metadata.get("publish_date", ""))[:4]
+    return f"{source}_{year if year.isdigit() else 'unknown'}"
+
+def list_shards(by_year=False):
+    """{shard name: source} from a DISTINCT scan; chunk text is only read later, one shard at a time."""
+    conn = sqlite3.connect(SQLITE_DB_PATH)
+    rows = conn.execute(
+        "SELECT DISTINCT source, substr(publish_date, 1, 4) FROM articles WHERE content IS NOT NULL AND content != ''"
+    ).fetchall()
+    conn.close()
+    return {shard_key({"source": source, "publish_date": year}, by_year): source for source, year in rows}
+
+def create_sharded_vector_stores(root, base_root=None, by_year=False, concurrency=EMBED_CONCURRENCY,
+                                 requests_per_minute=EMBED_REQUESTS_PER_MINUTE):
+    """Builds one FAISS index per source (or source+year) under `root` and writes the shard manifest."""
+    shards_dir = os.path.join(root, SHARDS_DIR_NAME)
+    manifest_path = os.path.join(shards_dir, SHARD_MANIFEST_NAME)
+    shards = list_shards(by_year)
+    manifest = {"shard_by": "source_year" if by_year else "source", "shards": {}}
+    for name in sorted(shards):
+        print(f"\n📦 Shard '{name}'")
+        documents = (doc for doc in iter_articles(shards[name]) if shard_key(doc.metadata, by_year) == name)
+        total = create_vector_store(iter_chunks(documents), os.path.join(shards_dir, name),
+                                    base_dir=os.path.join(base_root, SHARDS_DIR_NAME, name) if base_root else None,
+                                    concurrency=concurrency, requests_per_minute=requests_per_minute)
+        manifest["shards"][name] = {
+            "source": shards[name] or "unknown",
+            "year": name.rsplit("_", 1)[1] if by_year else None,
+            "chunks": total,
+        }
+
+    os.makedirs(shards_dir, exist_ok=True)
+    write_json(manifest_path, manifest, indent=2)
+    print(f"🗂️ Shard manifest written to {manifest_path}")
+
+def index_dirs(root):
+    """Built chunk index directories of a serving tree: {"" : monolithic} or one entry per shard."""
+    manifest_path = os.path.join(root, SHARDS_DIR_NAME, SHARD_MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return {name: os.path.join(root, SHARDS_DIR_NAME, name) for name in json.load(f)["shards"]}
+    if os.path.exists(os.path.join(root, INDEX_FILE_NAME)):
+        return {"": root}
+    return {}
+
+def write_json(path, data, **kwargs):
+    """Temp file + rename: staging files may be hard links into the published build (see start_staging)."""
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, **kwargs)
+    os.replace(path + ".tmp", path)
+
+def write_faiss_index(index, path):
+    faiss.write_index(index, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+def export_chunk_stores(root):
+    """
+    Converts indexes built before the build wrote chunks.db itself (pickled docstore in index.pkl):
+    chunk text + metadata go into a SQLite `chunks` table keyed by FAISS position, so the backend can
+    mmap index.faiss and fetch only the top-k hits instead of unpickling the whole docstore.
+    """
+    print("\nExporting SQLite chunk stores for mmap serving...")
+    embeddings = GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL, task_type=EMBEDDING_TASK_TYPE)
+    for name, index_dir in index_dirs(root).items():
+        if has_chunk_store(index_dir) or not os.path.exists(os.path.join(index_dir, "index.pkl")):
+            continue
+        store = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+        total = store.index.ntotal
+        docs = [store.docstore.search(store.index_to_docstore_id[i]) for i in range(total)]
+        rows = ((idx, chunk_id, doc.page_content, doc.metadata) for idx, (chunk_id, doc) in enumerate(iter_chunk_ids(docs)))
+        write_chunk_store(index_dir, tqdm(rows, total=total, desc=f"Exporting {name or 'index'}", unit="chunk"))
+        print(f"✅ {index_dir}/{CHUNKS_DB_NAME} ({total} chunks)")
+
+def create_ann_indexes(index_types, root, base_root=None):
+    """
+    Builds approximate variants (IVF-Flat, IVF-PQ, HNSW, SQ8 ...) from the exact index's vectors
+    and writes them as index_<type>.faiss next to it. The backend picks one with FAISS_INDEX_TYPE;
+    compare them first with benchmark_ann.py.
+    Variants the published build (`base_root`) or `root` already has are always rebuilt too: after a
+    build changed the exact index their positions no longer match chunks.db.
+    """
+    for name, index_dir in index_dirs(root).items():
+        base_dir = os.path.join(base_root, os.path.relpath(index_dir, root)) if base_root else index_dir
+        existing = [t for t in ANN_INDEX_TYPES if t != "flat" and any(
+            os.path.exists(os.path.join(d, ann_index_file(t))) for d in (index_dir, base_dir))]
+        types = [t for t in ANN_INDEX_TYPES if t != "flat" and (t in index_types or t in existing)]
+        if not types:
+            continue
+        exact = faiss.read_index(os.path.join(index_dir, "index.faiss"))
+        vectors = exact.reconstruct_n(0, exact.ntotal)
+        for index_type in types:
+            start = time.time()
+            print(f"🏗️ Building {index_type} for {name or 'index'} ({exact.ntotal} vectors)...")
+            index = build_ann_index(vectors, index_type)
+            write_faiss_index(index, os.path.join(index_dir, ann_index_file(index_type)))
+            print(f"✅ {ann_index_file(index_type)} written in {time.time() - start:.1f}s")
+
+def create_article_index(root):
+    """
+    Pools every article's chunk vectors into one normalized centroid and writes an article-level index.
+    Each centroid row keeps references to its chunks (shard name, vector id) for the fine rerank stage.
+    Returns False when there is no chunk index to pool.
+    """
+    print("\nBuilding article-level centroid index...")
+    dirs = index_dirs(root)
+    if not dirs:
+        print("❌ No chunk index found, build it first.")
+        return False
+    missing = [index_dir for index_dir in dirs.values() if not has_chunk_store(index_dir)]
+    if missing:
+        print(f"❌ No {CHUNKS_DB_NAME} in {', '.join(missing)}, run --only-export-chunks first.")
+        return False
+
+    sums = {}
+    chunk_refs = defaultdict(list)
+    sources = {}
+    for name, index_dir in dirs.items():
+        index = faiss.read_index(os.path.join(index_dir, INDEX_FILE_NAME))
+        vectors = index.reconstruct_n(0, index.ntotal)
+        conn = sqlite3.connect(os.path.join(index_dir, CHUNKS_DB_NAME))
+        rows = conn.execute("SELECT vector_id, article_id, json_extract(metadata, '$.source') FROM chunks ORDER BY vector_id")
+        for idx, article_id, source in tqdm(rows, total=index.ntotal, desc=f"Pooling {name or 'index'}", unit="chunk"):
+            if not article_id:
+                continue
+            sums[article_id] = sums[article_id] + vectors[idx] if article_id in sums else vectors[idx].copy()
+            chunk_refs[article_id].append([name, idx])
+            sources[article_id] = source or "unknown"
+        conn.close()
+
+    article_ids = sorted(sums)
+    centroids = np.vstack([sums[a] / len(chunk_refs[a]) for a in article_ids]).astype(np.float32)
+    faiss.normalize_L2(centroids)
+
+    index = faiss.IndexFlatL2(centroids.shape[1])
+    index.add(centroids)
+
+    article_dir = os.path.join(root, ARTICLE_INDEX_DIR_NAME)
+    os.makedirs(article_dir, exist_ok=True)
+    write_faiss_index(index, os.path.join(article_dir, INDEX_FILE_NAME))
+    write_json(os.path.join(article_dir, "article_meta.json"), {
+        "article_ids": article_ids,
+        "sources": [sources[a] for a in article_ids],
+        "chunks": [chunk_refs[a] for a in article_ids],
+    })
+    print(f"✅ Article index: {len(article_ids)} articles from {sum(len(v) for v in chunk_refs.values())} chunks -> {article_dir}")
+    return True
+
+def start_staging(mode):
+    """
+    Prepares STAGING_DIR for this run. A full build ("none" / "source" / "source_year" sharding) resumes
+    the staging tree a crashed run of the same kind left, checkpoints included. Runs that only rebuild
+    derived files ("copy") start from a copy of the published build. That copy hard-links the large files,
+    so nothing in staging may be rewritten in place: every write goes through a temp file and a rename
+    (chunks.db, stamped in place at publish time, is copied instead).
+    """
+    info_path = os.path.join(STAGING_DIR, STAGING_INFO_NAME)
+    if os.path.exists(STAGING_DIR):
+        previous = None
+        if os.path.exists(info_path):
+            with open(info_path, "r", encoding="utf-8") as f:
+                previous = json.load(f).get("mode")
+        if mode != "copy" and previous == mode:
+            print(f"♻️ Resuming the unfinished build in {STAGING_DIR}")
+            return
+        print(f"🧹 Discarding the unfinished {previous or 'unknown'} build in {STAGING_DIR}")
+        shutil.rmtree(STAGING_DIR)
+    os.makedirs(STAGING_DIR)
+
+    published, _ = published_build(FAISS_DB_DIR)
+    if mode == "copy" and os.path.exists(published):
+        for dirpath, dirnames, filenames in os.walk(published):
+            rel = os.path.relpath(dirpath, published)
+            # The unversioned layout is served from the root itself, next to builds/ and the staging dir
+            dirnames[:] = [d for d in dirnames if d != CHECKPOINT_DIR_NAME and
+                           not (rel == "." and d in (BUILDS_DIR_NAME, STAGING_DIR_NAME))]
+            os.makedirs(os.path.join(STAGING_DIR, rel), exist_ok=True)
+            for name in filenames:
+                if name.endswith(".tmp") or (rel == "." and name == CURRENT_BUILD_FILE):
+                    continue
+                src, dst = os.path.join(dirpath, name), os.path.join(STAGING_DIR, rel, name)
+                if name == CHUNKS_DB_NAME:
+                    shutil.copy2(src, dst)
+                    continue
+                try:
+                    os.link(src, dst)
+                except OSError:
+                    shutil.copy2(src, dst)
+    write_json(info_path, {"mode": mode})
+
+def publish_build(build_id):
+    """
+    Stamps every serving file in STAGING_DIR with `build_id` (build.json per index directory, chunks.db,
+    article_meta.json), moves the tree to builds/<build_id>/ in one rename and then points CURRENT at it
+    with an atomic replace: a server starting at any moment loads the old build or the new one, never a mix.
+    """
+    for index_dir in index_dirs(STAGING_DIR).values():
+        if has_chunk_store(index_dir):
+            stamp_chunk_store(os.path.join(index_dir, CHUNKS_DB_NAME), build_id)
+        write_build_info(index_dir, build_id)
+    meta_path = os.path.join(STAGING_DIR, ARTICLE_INDEX_DIR_NAME, "article_meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        meta["build_id"] = build_id
+        write_json(meta_path, meta)
+    os.remove(os.path.join(STAGING_DIR, STAGING_INFO_NAME))
+
+    builds_dir = os.path.join(FAISS_DB_DIR, BUILDS_DIR_NAME)
+    os.makedirs(builds_dir, exist_ok=True)
+    _, previous_id = published_build(FAISS_DB_DIR)
+    os.rename(STAGING_DIR, os.path.join(builds_dir, build_id))
+    current_path = os.path.join(FAISS_DB_DIR, CURRENT_BUILD_FILE)
+    with open(current_path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(build_id)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(current_path + ".tmp", current_path)
+    print(f"🚀 Published build {build_id} ({os.path.join(builds_dir, build_id)})")
+
+    # Older builds go; the previous one stays for servers that have not restarted yet
+    for name in os.listdir(builds_dir):
+        if name not in (build_id, previous_id):
+            shutil.rmtree(os.path.join(builds_dir, name), ignore_errors=True)
 
 if __name__ == "__main__":
-    docs = get_articles_from_db()
-    if docs:
-        chunks = split_documents(docs)
-        create_vector_store(chunks)
+    parser = argparse.ArgumentParser(description="Build the FAISS vector index from SQLite")
+    parser.add_argument("--shard-by", choices=["none", "source", "source_year"], default="none",
+                        help="Write one index per source (or per source+year) under shards/ of the build")
+    parser.add_argument("--only-article-index", action="store_true",
+                        help="Skip chunk embedding and only rebuild the article-level centroid index")
+    parser.add_argument("--ann-types", nargs="+", choices=ANN_INDEX_TYPES, default=[],
+                        help="Also build these approximate index variants (serve with FAISS_INDEX_TYPE=<type>)")
+    parser.add_argument("--only-ann-index", action="store_true",
+                        help="Skip chunk embedding and only (re)build the --ann-types variants")
+    parser.add_argument("--only-export-chunks", action="store_true",
+                        help="Skip chunk embedding and only write chunks.db for indexes built before it existed (index.pkl only)")
+    parser.add_argument("--concurrency", type=int, default=EMBED_CONCURRENCY, help="Embedding requests in flight")
+    parser.add_argument("--rpm", type=int, default=EMBED_REQUESTS_PER_MINUTE,
+                        help="Max embedding requests per minute (halved on 429, then ramps back up)")
+    args = parser.parse_args()
+
+    # Every run builds a complete tree in STAGING_DIR and publishes it as one new build
+    build_id = f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    published, _ = published_build(FAISS_DB_DIR)
+    if args.only_article_index:
+        start_staging("copy")
+        ready = create_article_index(STAGING_DIR)
+    elif args.only_export_chunks:
+        start_staging("copy")
+        export_chunk_stores(STAGING_DIR)
+        ready = bool(index_dirs(STAGING_DIR))
+    elif args.only_ann_index:
+        start_staging("copy")
+        create_ann_indexes(args.ann_types, STAGING_DIR)
+        ready = bool(index_dirs(STAGING_DIR))
+    else:
+        start_staging(args.shard_by)
+        if args.shard_by == "none":
+            create_vector_store(iter_chunks(iter_articles()), STAGING_DIR, base_dir=published,
+                                concurrency=args.concurrency, requests_per_minute=args.rpm)
+        else:
+            create_sharded_vector_stores(STAGING_DIR, base_root=published, by_year=(args.shard_by == "source_year"),
+                                         concurrency=args.concurrency, requests_per_minute=args.rpm)
+        ready = create_article_index(STAGING_DIR)
+        if ready:
+            create_ann_indexes(args.ann_types, STAGING_DIR, base_root=published)
+    if ready:
+        publish_build(build_id)
     else:
-        print("No documents found in SQLite database.")
\ No newline at end of file
+        print(f"❌ Nothing published, the serving build is unchanged ({published})")
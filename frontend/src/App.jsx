@@ -1,8 +1,8 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { Search, ArrowRight, X, Calendar, User, BookOpen, Sparkles, Filter } from 'lucide-react';
 import ReactMarkdown from 'react-markdown';
-import { searchArticles, searchSql, getArticleDetail, summarizeArticle, travelTimeMachine } from './api';
+import { searchHybrid, searchSql, getArticleDetail, summarizeArticle, streamSummary, travelTimeMachine } from './api';
 import clsx from 'clsx';
 import { Clock, RefreshCw } from 'lucide-react'; // Add icons
 
@@ -24,6 +24,7 @@ function App() {
   const [selectedArticle, setSelectedArticle] = useState(null);
   const [generatingSummary, setGeneratingSummary] = useState(false);
   const [summaryCache, setSummaryCache] = useState({});
+  const closeSummaryStream = useRef(null); // Closes the summary stream of the currently open article
   
   // Time Machine State
   const [timeMachineData, setTimeMachineData] = useState(null);
@@ -56,7 +57,10 @@ function App() {
     
     let data = [];
     if (searchMode === 'rag') {
-        data = await searchArticles(query, source);
+        // One request: vector + keyword results fused server-side (exact names / codes no longer get lost)
+        const hybrid = await searchHybrid(query, source);
+        console.log('⏱️ Hybrid search timings (ms):', hybrid.timings);
+        data = hybrid.results;
     } else {
         const s = startDate ? `${startDate}-01-01` : null;
         const e = endDate ? `${endDate}-12-31` : null;
@@ -68,23 +72,20 @@ function App() {
     setLoading(false);
   };
 
-  const openArticle = async (id) => {
-    // 1. Check Cache First
-    if (summaryCache[id]) {
-        console.log(`⚡ Cache Hit for Article ${id}`);
-        setSelectedArticle(summaryCache[id]);
-        return;
+  const closeArticle = () => {
+    if (closeSummaryStream.current) {
+        closeSummaryStream.current();
+        closeSummaryStream.current = null;
     }
+    setGeneratingSummary(false);
+    setSelectedArticle(null);
+  };
 
-    // 2. Fetch if not in cache
-    setSelectedArticle({ loading: true });
-    setGeneratingSummary(true);
-
+  // Fallback when the stream could not be opened: blocking endpoint
+  const loadSummary = async (id) => {
     const summaryData = await summarizeArticle(id);
-    
     setGeneratingSummary(false);
     if (summaryData) {
-        // 3. Update Cache & View
         setSummaryCache(prev => ({ ...prev, [id]: summaryData }));
         setSelectedArticle(summaryData);
     } else {
@@ -92,6 +93,49 @@ function App() {
     }
   };
 
+  const openArticle = (id) => {
+    if (closeSummaryStream.current) closeSummaryStream.current();
+    closeSummaryStream.current = null;
+
+    // 1. Check Cache First
+    if (summaryCache[id]) {
+        console.log(`⚡ Cache Hit for Article ${id}`);
+        setSelectedArticle(summaryCache[id]);
+        return;
+    }
+
+    // 2. Stream the summary: the header shows on `meta`, text grows with every `token`
+    setSelectedArticle({ loading: true });
+    setGeneratingSummary(true);
+
+    let article = null;
+    const close = streamSummary(id, {
+        onMeta: (meta) => {
+            article = { ...meta, summary: '' };
+            setSelectedArticle(article);
+        },
+        onToken: (piece) => {
+            article = { ...article, summary: article.summary + piece };
+            setSelectedArticle(article);
+        },
+        onDone: () => {
+            closeSummaryStream.current = null;
+            setGeneratingSummary(false);
+            // 3. Update Cache
+            setSummaryCache(prev => ({ ...prev, [id]: article }));
+        },
+        onError: () => {
+            closeSummaryStream.current = null;
+            if (article && article.summary) {
+                setGeneratingSummary(false); // Keep what was streamed (or the server's fallback text)
+            } else {
+                loadSummary(id);
+            }
+        },
+    });
+    closeSummaryStream.current = close;
+  };
+
   return (
     <div className="min-h-screen bg-slate-50 text-slate-900 selection:bg-fudan-orange selection:text-white overflow-x-hidden">
       
@@ -388,7 +432,7 @@ function App() {
             animate={{ opacity: 1 }}
             exit={{ opacity: 0 }}
             className="fixed inset-0 z-50 flex justify-end bg-black/30 backdrop-blur-sm"
-            onClick={() => setSelectedArticle(null)}
+            onClick={closeArticle}
           >
             <motion.div
               initial={{ x: "100%" }}
@@ -437,7 +481,7 @@ function App() {
               {!selectedArticle.loading && (
                   <div className="p-12 md:p-20 max-w-3xl mx-auto">
                     <button 
-                      onClick={() => setSelectedArticle(null)}
+                      onClick={closeArticle}
                       className="fixed top-8 right-8 p-2 hover:bg-slate-100 rounded-full transition-colors z-50"
                     >
                       <X size={32} className="text-slate-400 hover:text-fudan-blue" />
@@ -17,6 +17,24 @@ export async function searchArticles(query, source = null) {
   }
 }
 
+// Vector + keyword search fused server-side. Returns { results, timings }.
+export async function searchHybrid(query, source = null) {
+  try {
+    const response = await fetch(`${API_BASE_URL}/hybrid_search`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({ query, top_k: 20, source }),
+    });
+    if (!response.ok) throw new Error("Hybrid search failed");
+    return await response.json();
+  } catch (error) {
+    console.error(error);
+    return { results: [], timings: {} };
+  }
+}
+
 export async function searchSql(keyword, start_date = null, end_date = null, source = null) {
   try {
     const response = await fetch(`${API_BASE_URL}/sql_search`, {
@@ -62,6 +80,23 @@ export async function summarizeArticle(id) {
   }
 }
 
+// Streams the summary over SSE. onMeta/onToken/onDone are called as events arrive.
+// Returns a function that closes the stream.
+export function streamSummary(id, { onMeta, onToken, onDone, onError } = {}) {
+  const source = new EventSource(`${API_BASE_URL}/summarize_article/${id}/stream`);
+  source.addEventListener("meta", (e) => onMeta && onMeta(JSON.parse(e.data)));
+  source.addEventListener("token", (e) => onToken && onToken(JSON.parse(e.data)));
+  source.addEventListener("done", (e) => {
+    source.close();
+    onDone && onDone(JSON.parse(e.data));
+  });
+  source.addEventListener("error", (e) => {
+    source.close();
+    onError && onError(e);
+  });
+  return () => source.close();
+}
+
 export async function travelTimeMachine(date = null) {
   try {
     const url = date ? `${API_BASE_URL}/time_machine?date=${date}` : `${API_BASE_URL}/time_machine`;
@@ -0,0 +1,88 @@
+import sqlite3
+import os
+import asyncio
+import argparse
+from tqdm import tqdm
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+
+from backend.summary_store import SummaryStore, SUMMARY_PROMPT, SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, summary_input, content_hash
+
+# Configuration
+GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
+if not GOOGLE_API_KEY:
+    raise ValueError("GOOGLE_API_KEY environment variable is not set")
+os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
+
+# Paths (same locations the backend uses locally)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SQLITE_DB_PATH = os.path.join(BASE_DIR, 'fudan_knowledge_base.db')
+SUMMARY_DB_PATH = os.path.join(BASE_DIR, 'article_summaries.db')
+
+# Configuration
+MAX_CONCURRENCY = 4  # Parallel LLM calls in flight
+MAX_RETRIES = 3
+
+def get_pending_articles(store, limit=None):
+    """Articles whose (id, content hash) has no summary under the current prompt version."""
+    print("Reading data from SQLite...")
+    conn = sqlite3.connect(SQLITE_DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, title, content FROM articles WHERE content IS NOT NULL AND content != '' ORDER BY id")
+    rows = cursor.fetchall()
+    conn.close()
+
+    done = store.done_keys()
+    pending = []
+    for article_id, title, content in rows:
+        digest = content_hash(title, content)
+        if (article_id, digest) not in done:
+            pending.append((article_id, title, content, digest))
+    print(f"{len(rows)} articles, {len(rows) - len(pending)} already summarised, {len(pending)} pending.")
+    return pending[:limit] if limit else pending
+
+async def summarize_one(chain, store, semaphore, article):
+    article_id, title, content, digest = article
+    async with semaphore:
+        for attempt in range(MAX_RETRIES):
+            try:
+                summary = await chain.ainvoke(summary_input(title, content))
+                # Commit each summary as soon as it's ready -> a crash loses at most the in-flight calls
+                await asyncio.to_thread(store.put, article_id, digest, summary)
+                return True
+            except Exception as e:
+                if attempt == MAX_RETRIES - 1:
+                    tqdm.write(f"❌ Article {article_id} failed: {e}")
+                    return False
+                await asyncio.sleep(2 ** (attempt + 1))
+
+async def run(concurrency, limit):
+    store = SummaryStore(SUMMARY_DB_PATH)
+    print(f"Prompt version: {SUMMARY_PROMPT_VERSION} | Model: {SUMMARY_MODEL} | Concurrency: {concurrency}")
+
+    pending = get_pending_articles(store, limit)
+    if not pending:
+        print("🎉 All articles are already summarised!")
+        return
+
+    llm = ChatGoogleGenerativeAI(model=SUMMARY_MODEL, temperature=0.3, convert_system_message_to_human=True)
+    chain = PromptTemplate.from_template(SUMMARY_PROMPT) | llm | StrOutputParser()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    tasks = [asyncio.create_task(summarize_one(chain, store, semaphore, article)) for article in pending]
+    ok = 0
+    for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Summarising", unit="article"):
+        if await task:
+            ok += 1
+
+    print(f"🎉 Done. {ok}/{len(pending)} summaries written to {SUMMARY_DB_PATH}")
+    if ok < len(pending):
+        print("Re-run the script to retry the failed articles (finished ones are skipped).")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute article summaries for /api/summarize_article")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY)
+    parser.add_argument("--limit", type=int, default=None, help="Only process the first N pending articles")
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency, args.limit))